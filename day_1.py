@@ -22,8 +22,6 @@ The Fuel Counter-Upper needs to know the total fuel requirement. To find it, ind
 
 What is the sum of the fuel requirements for all of the modules on your spacecraft?
 """
-from math import floor
-
 def calc_fuel_load_per_module(module_mass):
     """
     >>> calc_fuel_load_per_module(12)
@@ -35,7 +33,7 @@ def calc_fuel_load_per_module(module_mass):
     >>> calc_fuel_load_per_module(100756)
     33583
     """
-    return floor(module_mass / 3) - 2
+    return module_mass // 3 - 2
 
 def calc_fuel_load_for_modules(modules):
     """
@@ -55,8 +53,7 @@ def calc_fuel_load_for_modules_in_file(filename='day_1_input.txt'):
     >>> calc_fuel_load_for_modules_in_file()
     3234871
     """
-    module_list = read_modules(filename)
-    return calc_fuel_load_for_modules(module_list)
+    return stream_fuel_load_for_modules_in_file(filename)
 
 #------------------------------------------------------------------------------#
 """
@@ -83,12 +80,15 @@ def calc_total_fuel_load_per_module(module_mass):
     966
     >>> calc_total_fuel_load_per_module(100756)
     50346
+    >>> calc_total_fuel_load_per_module(10**400) > 10**399
+    True
     """
-    fuel_load = floor(module_mass / 3) - 2
-    if fuel_load <= 0:
-        return 0
-    else:
-        return fuel_load + calc_total_fuel_load_per_module(fuel_load)
+    total = 0
+    fuel_load = module_mass // 3 - 2
+    while fuel_load > 0:
+        total += fuel_load
+        fuel_load = fuel_load // 3 - 2
+    return total
 
 def calc_total_fuel_load_for_modules(modules):
     """
@@ -104,8 +104,383 @@ def calc_total_fuel_load_for_modules_in_file(filename='day_1_input.txt'):
     >>> calc_total_fuel_load_for_modules_in_file()
     4849444
     """
-    module_list = read_modules(filename)
-    return calc_total_fuel_load_for_modules(module_list)
+    return stream_total_fuel_load_for_modules_in_file(filename)
+
+#------------------------------------------------------------------------------#
+import numpy as np
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+def as_mass_array(masses):
+    """
+    >>> as_mass_array([12, 14]).dtype
+    dtype('int64')
+    >>> as_mass_array([12, 2**70]).dtype
+    dtype('O')
+    >>> as_mass_array(np.array([2**63 + 5], dtype=np.uint64)).tolist()
+    [9223372036854775813]
+    >>> as_mass_array(np.array([12.5])) # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    TypeError: Cannot cast array data from dtype('float64') to dtype('int64') ...
+    """
+    if isinstance(masses, np.ndarray):
+        if masses.dtype == object:
+            return masses
+        if masses.dtype.kind == 'u' and masses.size and int(masses.max()) >= 2**63:
+            return masses.astype(object)
+        if masses.dtype.kind == 'u':
+            return masses.astype(np.int64)
+        return masses.astype(np.int64, casting='safe')
+    try:
+        return np.asarray(masses, dtype=np.int64)
+    except OverflowError:
+        return np.asarray(masses, dtype=object)
+
+def exact_sum(values):
+    """
+    >>> exact_sum(np.array([2**62, 2**62], dtype=np.int64))
+    9223372036854775808
+    >>> exact_sum(np.array([], dtype=np.int64))
+    0
+    """
+    if values.size == 0:
+        return 0
+    if values.dtype != object:
+        bound = max(abs(int(values.max())), abs(int(values.min())))
+        if bound * values.size < 2**63:
+            return int(values.sum())
+    return int(values.astype(object).sum())
+
+def batch_fuel_load(masses):
+    """
+    >>> batch_fuel_load([12, 14])
+    4
+    >>> batch_fuel_load([1969, 100756])
+    34237
+    >>> batch_fuel_load(read_modules('day_1_input.txt'))
+    3234871
+    >>> big = [2**53 + 1, 2**70 + 5]
+    >>> batch_fuel_load(big) == calc_fuel_load_for_modules(big)
+    True
+    >>> batch_fuel_load(np.array([2**63 + 5], dtype=np.uint64))
+    3074457345618258602
+    """
+    return exact_sum(as_mass_array(masses) // 3 - 2)
+
+def batch_total_fuel_load(masses):
+    """
+    >>> batch_total_fuel_load([12, 14])
+    4
+    >>> batch_total_fuel_load([1969, 100756])
+    51312
+    >>> batch_total_fuel_load(read_modules('day_1_input.txt'))
+    4849444
+    >>> big = [2**53 + 1, 2**62, 2**70 + 5]
+    >>> batch_total_fuel_load(big) == calc_total_fuel_load_for_modules(big)
+    True
+    """
+    fuel = as_mass_array(masses) // 3 - 2
+    total = 0
+    while fuel.size:
+        fuel = fuel[fuel > 0]
+        total += exact_sum(fuel)
+        fuel = fuel // 3 - 2
+    return total
+
+#------------------------------------------------------------------------------#
+class ModuleStream:
+    """
+    Reads a manifest in fixed-size byte chunks and yields one mass array per
+    chunk, so only a single chunk is ever held in memory.
+
+    >>> stream = ModuleStream('day_1_input.txt', chunk_size=64)
+    >>> sum(len(chunk) for chunk in stream)
+    100
+    >>> stream.bytes_read
+    644
+    >>> stream.throughput() > 0
+    True
+    """
+    def __init__(self, filename, chunk_size=1 << 20):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        self.bytes_read = 0
+        self.elapsed = 0.0
+        remainder = b''
+        with open(self.filename, 'rb') as f:
+            while True:
+                start = time.perf_counter()
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                self.bytes_read += len(chunk)
+                # Keep a trailing partial number for the next chunk
+                head, _, remainder = (remainder + chunk).rpartition(b'\n')
+                masses = as_mass_array([int(x) for x in head.split()])
+                self.elapsed += time.perf_counter() - start
+                if masses.size:
+                    yield masses
+        if remainder.strip():
+            yield as_mass_array([int(x) for x in remainder.split()])
+
+    def throughput(self):
+        """Parse throughput of the last pass in MB/s."""
+        if self.elapsed == 0:
+            return 0.0
+        return self.bytes_read / self.elapsed / 1e6
+
+def stream_fuel_load_for_modules_in_file(filename='day_1_input.txt', chunk_size=1 << 20):
+    """
+    >>> stream_fuel_load_for_modules_in_file(chunk_size=10)
+    3234871
+    """
+    return sum(batch_fuel_load(m) for m in ModuleStream(filename, chunk_size))
+
+def stream_total_fuel_load_for_modules_in_file(filename='day_1_input.txt', chunk_size=1 << 20):
+    """
+    >>> stream_total_fuel_load_for_modules_in_file(chunk_size=10)
+    4849444
+    """
+    return sum(batch_total_fuel_load(m) for m in ModuleStream(filename, chunk_size))
+
+#------------------------------------------------------------------------------#
+class FuelTable:
+    """
+    Cumulative part 2 fuel for every mass up to `limit`, so a module only
+    needs a few divisions before its fuel chain lands inside the table.
+
+    >>> table = FuelTable(limit=10000)
+    >>> table.size
+    10001
+    >>> table.lookup(1969), table.lookup(100756)
+    (966, 50346)
+    >>> table.total([12, 14, 1969, 100756])
+    51316
+    >>> table.hits, table.misses, table.divisions
+    (4, 2, 6)
+    >>> table.hit_rate()
+    0.6666666666666666
+    >>> table.build_time >= 0
+    True
+    >>> small = FuelTable(limit=1)
+    >>> [small.lookup(m) for m in (2, 5, 12, 1969)]
+    [0, 0, 2, 966]
+    """
+    def __init__(self, limit=1 << 20):
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        self.divisions = 0
+
+        start = time.perf_counter()
+        table = np.zeros(limit + 1, dtype=np.int64)
+        # Every mass in [lo, 3 * lo) only depends on masses below lo
+        lo = 9
+        while lo <= limit:
+            hi = min(3 * lo, limit + 1)
+            fuel = np.arange(lo, hi, dtype=np.int64) // 3 - 2
+            table[lo:hi] = fuel + table[fuel]
+            lo = hi
+        self.table = table
+        self.build_time = time.perf_counter() - start
+
+    @property
+    def size(self):
+        return len(self.table)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, module_mass):
+        total = 0
+        if module_mass <= self.limit:
+            self.hits += 1
+        else:
+            self.misses += 1
+            while module_mass > self.limit:
+                module_mass = module_mass // 3 - 2
+                self.divisions += 1
+                if module_mass <= 0:
+                    return total
+                total += module_mass
+        return total + int(self.table[max(module_mass, 0)])
+
+    def total(self, modules):
+        return sum(self.lookup(m) for m in modules)
+
+#------------------------------------------------------------------------------#
+FileFuelLoad = namedtuple('FileFuelLoad', ['filename', 'fuel', 'total_fuel', 'error'])
+
+def calc_fuel_loads_for_file(filename):
+    """
+    >>> calc_fuel_loads_for_file('day_1_input.txt')
+    FileFuelLoad(filename='day_1_input.txt', fuel=3234871, total_fuel=4849444, error=None)
+    >>> calc_fuel_loads_for_file('missing.txt').error
+    "FileNotFoundError: [Errno 2] No such file or directory: 'missing.txt'"
+    """
+    try:
+        fuel = 0
+        total_fuel = 0
+        for masses in ModuleStream(filename):
+            fuel += batch_fuel_load(masses)
+            total_fuel += batch_total_fuel_load(masses)
+        return FileFuelLoad(filename, fuel, total_fuel, None)
+    except Exception as e:
+        return FileFuelLoad(filename, None, None, '{}: {}'.format(type(e).__name__, e))
+
+def list_manifest_files(files):
+    """
+    A directory lists its files sorted; any other single path is one file.
+
+    >>> list_manifest_files('day_1_input.txt'), list_manifest_files(['a', 'b'])
+    (['day_1_input.txt'], ['a', 'b'])
+    """
+    if isinstance(files, (str, bytes, os.PathLike)):
+        if not os.path.isdir(files):
+            return [files]
+        return sorted(os.path.join(files, f) for f in os.listdir(files)
+                      if os.path.isfile(os.path.join(files, f)))
+    return list(files)
+
+def calc_fuel_loads_for_files(files, workers=None):
+    """
+    Shards manifest files over a process pool. Results keep the input order
+    (directories are listed sorted) and failed files carry their error.
+
+    >>> results, grand_total = calc_fuel_loads_for_files(
+    ...     ['day_1_input.txt', 'missing.txt', 'day_1_input.txt'], workers=2)
+    >>> [r.fuel for r in results]
+    [3234871, None, 3234871]
+    >>> grand_total
+    (6469742, 9698888)
+    >>> calc_fuel_loads_for_files('day_1_input.txt', workers=1)[1]
+    (3234871, 4849444)
+    """
+    filenames = list_manifest_files(files)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(calc_fuel_loads_for_file, filenames))
+    ok = [r for r in results if r.error is None]
+    grand_total = (sum(r.fuel for r in ok), sum(r.total_fuel for r in ok))
+    return results, grand_total
+
+#------------------------------------------------------------------------------#
+class FuelLedger:
+    """
+    Running part 1 and part 2 totals over a set of named modules.
+
+    >>> ledger = FuelLedger({'a': 12, 'b': 14})
+    >>> ledger.fuel, ledger.total_fuel
+    (4, 4)
+    >>> ledger.add('c', 1969)
+    >>> ledger.update('a', 100756)
+    >>> ledger.fuel, ledger.total_fuel
+    (34239, 51314)
+    >>> ledger.remove('b')
+    >>> len(ledger), ledger.fuel, ledger.total_fuel
+    (2, 34237, 51312)
+    >>> ledger.apply_deltas(['+ d 12', '- c', '= a 14', ''])
+    3
+    >>> ledger.fuel, ledger.total_fuel
+    (4, 4)
+    """
+    def __init__(self, modules=None):
+        self.masses = {}
+        self.fuel = 0
+        self.total_fuel = 0
+        for module_id, mass in (modules or {}).items():
+            self.add(module_id, mass)
+
+    def __len__(self):
+        return len(self.masses)
+
+    def _account(self, mass, sign):
+        self.fuel += sign * calc_fuel_load_per_module(mass)
+        self.total_fuel += sign * calc_total_fuel_load_per_module(mass)
+
+    def add(self, module_id, mass):
+        if module_id in self.masses:
+            raise KeyError('module {!r} already in ledger'.format(module_id))
+        self.masses[module_id] = mass
+        self._account(mass, 1)
+
+    def remove(self, module_id):
+        self._account(self.masses.pop(module_id), -1)
+
+    def update(self, module_id, mass):
+        self._account(self.masses[module_id], -1)
+        self.masses[module_id] = mass
+        self._account(mass, 1)
+
+    def apply_deltas(self, lines):
+        """
+        Applies delta lines of the form `+ id mass`, `- id` or `= id mass`
+        and returns the number of changes applied. The whole batch is parsed
+        first and rolled back if any change fails, so a bad file changes
+        nothing.
+
+        >>> ledger = FuelLedger({'a': 12})
+        >>> ledger.apply_deltas(['+ b 14', '+ c x'])
+        Traceback (most recent call last):
+        ...
+        ValueError: line 2: bad mass 'x'
+        >>> ledger.apply_deltas(['+ b 14', '- z'])
+        Traceback (most recent call last):
+        ...
+        KeyError: 'z'
+        >>> sorted(ledger.masses), ledger.fuel
+        (['a'], 2)
+        """
+        arity = {'+': 3, '-': 2, '=': 3}
+        deltas = []
+        for line_nr, line in enumerate(lines, 1):
+            fields = line.split()
+            if not fields:
+                continue
+            op = fields[0]
+            if op not in arity:
+                raise ValueError('line {}: unknown delta {!r}'.format(line_nr, op))
+            if len(fields) != arity[op]:
+                raise ValueError('line {}: {!r} takes {} fields, got {}'.format(
+                    line_nr, op, arity[op], len(fields)))
+            mass = None
+            if len(fields) == 3:
+                try:
+                    mass = int(fields[2])
+                except ValueError:
+                    raise ValueError('line {}: bad mass {!r}'.format(line_nr, fields[2])) from None
+            deltas.append((op, fields[1], mass))
+
+        undo = []
+        try:
+            for op, module_id, mass in deltas:
+                if op == '+':
+                    self.add(module_id, mass)
+                    undo.append(lambda m=module_id: self.remove(m))
+                elif op == '-':
+                    old = self.masses[module_id]
+                    self.remove(module_id)
+                    undo.append(lambda m=module_id, old=old: self.add(m, old))
+                else:
+                    old = self.masses[module_id]
+                    self.update(module_id, mass)
+                    undo.append(lambda m=module_id, old=old: self.update(m, old))
+        except Exception:
+            for action in reversed(undo):
+                action()
+            raise
+        return len(deltas)
+
+    def apply_delta_file(self, filename):
+        with open(filename) as f:
+            return self.apply_deltas(f)
 
 if __name__ == "__main__":
     import doctest
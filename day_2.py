@@ -52,11 +52,22 @@ Here are the initial and final states of a few more small programs:
 Once you have a working computer, the first step is to restore the gravity assist program (your puzzle input) to the "1202 program alarm" state it had just before the last computer caught fire. To do this, before running the program, replace position 1 with the value 12 and replace position 2 with the value 2. What value is left at position 0 after the program halts?
 """
 
+class UnknownOpcodeError(ValueError):
+    def __init__(self, code, stack_ptr):
+        super().__init__('unknown opcode {} at address {}'.format(code, stack_ptr))
+        self.code = code
+        self.stack_ptr = stack_ptr
+
 class Opcode:
+    registry = {}
+    dispatch_table = None
+
     def __init_subclass__(cls, opcode_id, **kwargs):
         super().__init_subclass__(**kwargs)
         cls.opcode_id = opcode_id
-    
+        Opcode.registry[int(opcode_id)] = cls
+        Opcode.dispatch_table = None
+
     def compare_code(self, code):
         return int(self.opcode_id) == int(code)
 
@@ -77,6 +88,11 @@ class AddOpcode(Opcode, opcode_id=1):
 
         return (stack_ptr + 4, sequence)
 
+    @staticmethod
+    def execute(ptr, mem):
+        mem[mem[ptr + 3]] = mem[mem[ptr + 1]] + mem[mem[ptr + 2]]
+        return ptr + 4
+
 class MulOpcode(Opcode, opcode_id=2):
     def run_opcode(self, stack_ptr, sequence):
         """
@@ -93,11 +109,20 @@ class MulOpcode(Opcode, opcode_id=2):
 
         return (stack_ptr + 4, sequence)
 
+    @staticmethod
+    def execute(ptr, mem):
+        mem[mem[ptr + 3]] = mem[mem[ptr + 1]] * mem[mem[ptr + 2]]
+        return ptr + 4
+
 class FinOpcode(Opcode, opcode_id=99):
     def run_opcode(self, stack_ptr, sequence):
         end = len(sequence)
         return (end, sequence)
 
+    @staticmethod
+    def execute(ptr, mem):
+        return len(mem)
+
 opcodes = [AddOpcode(), MulOpcode(), FinOpcode()]
 
 #------------------------------------------------------------------------------#
@@ -126,6 +151,10 @@ def parse_opcode(code_list):
     [2, 4, 4, 5, 99, 9801]
     >>> parse_opcode([1,1,1,4,99,5,6,0,99])
     [30, 1, 1, 4, 2, 5, 6, 0, 99]
+    >>> parse_opcode([1,0,0,0,42]) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    UnknownOpcodeError: unknown opcode 42 at address 4
     """
     stack_ptr = 0
     while stack_ptr != len(code_list):
@@ -133,15 +162,83 @@ def parse_opcode(code_list):
         for opcode in opcodes:
             if opcode.compare_code(code):
                 (stack_ptr, code_list) = opcode.run_opcode(stack_ptr, code_list)
+                break
+        else:
+            raise UnknownOpcodeError(code, stack_ptr)
     
     return code_list
 
-def gravity_assist_program():
+def build_dispatch_table():
+    """
+    Maps every registered opcode id to a `handler(ptr, memory) -> next_ptr`.
+    Opcodes that only implement `run_opcode` are adapted automatically.
+
+    >>> sorted(build_dispatch_table())
+    [1, 2, 99]
+    """
+    table = {}
+    for opcode_id, cls in Opcode.registry.items():
+        if 'execute' in vars(cls):
+            table[opcode_id] = cls.execute
+        else:
+            run_opcode = cls().run_opcode
+            table[opcode_id] = lambda ptr, mem, run=run_opcode: run(ptr, mem)[0]
+    return table
+
+def default_dispatch():
+    """
+    Dispatch table built once and rebuilt after any opcode (re-)registers.
+
+    >>> default_dispatch() is default_dispatch()
+    True
+    >>> class NegAddOpcode(Opcode, opcode_id=1):
+    ...     @staticmethod
+    ...     def execute(ptr, mem):
+    ...         mem[mem[ptr + 3]] = -(mem[mem[ptr + 1]] + mem[mem[ptr + 2]])
+    ...         return ptr + 4
+    >>> run_program([1,0,0,0,99])
+    [-2, 0, 0, 0, 99]
+    >>> class AddOpcode(AddOpcode, opcode_id=1):
+    ...     execute = AddOpcode.execute
+    >>> run_program([1,0,0,0,99])
+    [2, 0, 0, 0, 99]
+    """
+    if Opcode.dispatch_table is None:
+        Opcode.dispatch_table = build_dispatch_table()
+    return Opcode.dispatch_table
+
+def run_program(code_list, dispatch=None, ptr=0):
+    """
+    Table-dispatched interpreter; produces the same memory as parse_opcode.
+
+    >>> run_program([1,1,1,4,99,5,6,0,99])
+    [30, 1, 1, 4, 2, 5, 6, 0, 99]
+    >>> run_program([2,4,4,5,99,0])
+    [2, 4, 4, 5, 99, 9801]
+    >>> run_program([7,0,0,0,99]) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    UnknownOpcodeError: unknown opcode 7 at address 0
+    """
+    if dispatch is None:
+        dispatch = default_dispatch()
+    get_handler = dispatch.get
+    end = len(code_list)
+    while ptr != end:
+        handler = get_handler(code_list[ptr])
+        if handler is None:
+            raise UnknownOpcodeError(code_list[ptr], ptr)
+        ptr = handler(ptr, code_list)
+    return code_list
+
+def gravity_assist_program(cache=None):
     """
     >>> gravity_assist_program()
     4138658
     """
     code_list = read_codes('day_2_input.txt')
+    if cache is not None:
+        return cache.run(code_list, {1: 12, 2: 2}, outputs=(0,))[0]
     # Add defect in program
     code_list[1] = 12
     code_list[2] = 2
@@ -169,28 +266,1355 @@ Once the program has halted, its output is available at address 0, also just lik
 
 Find the input noun and verb that cause the program to produce the output 19690720. What is 100 * noun + verb? (For example, if noun=12 and verb=2, the answer would be 1202.)
 """
-import copy
 
-def find_output():
+def find_output(filename='day_2_input.txt', target=19690720,
+                nouns=range(0,100), verbs=range(0,100),
+                noun_addr=1, verb_addr=2, output_addr=0, cache=None):
     """
     >>> find_output()
     7264
+    >>> find_output(target=4138658)
+    1202
     """
-    code_list = read_codes('day_2_input.txt')
+    code_list = read_codes(filename)
+    memory = IntcodeMemory(code_list)
+    memory.snapshot()
     # Add defect in program
-    for noun in range(0,100):
-        for verb in range(0,100):
-            cpy_list = copy.deepcopy(code_list)
-            cpy_list[1] = noun
-            cpy_list[2] = verb
+    for noun in nouns:
+        for verb in verbs:
+            if cache is not None:
+                output = cache.run(code_list, {noun_addr: noun, verb_addr: verb},
+                                   outputs=(output_addr,))[0]
+            else:
+                memory.restore()
+                memory[noun_addr] = noun
+                memory[verb_addr] = verb
 
-            output = parse_opcode(cpy_list)[0]
+                output = parse_opcode(memory)[output_addr]
 
-            if output == 19690720:
+            if output == target:
                 return 100 * noun + verb
 
     return 0
 
+#------------------------------------------------------------------------------#
+import hashlib
+from array import array
+
+class SelfModifyingProgram(Exception):
+    pass
+
+compiled_programs = {}
+
+def program_hash(code_list, dynamic=()):
+    """
+    SHA-256 of a program with its dynamic cells zeroed.
+
+    >>> program_hash([1,5,6,0,99]) == program_hash([1,7,6,0,99], dynamic=(1,))
+    False
+    >>> program_hash([1,5,6,0,99], (1,)) == program_hash([1,7,6,0,99], (1,))
+    True
+    """
+    masked = list(code_list)
+    for addr in dynamic:
+        masked[addr] = 0
+    digest = hashlib.sha256(repr(sorted(dynamic)).encode())
+    try:
+        digest.update(array('q', masked).tobytes())
+    except OverflowError:
+        digest.update(repr(masked).encode())
+    return digest.hexdigest()
+
+def decode_straight_line(code_list, dynamic=()):
+    """
+    Returns the instruction addresses of a straight-line add/mul program, or
+    None when the program cannot be decoded statically.
+
+    >>> decode_straight_line([1,9,10,3,2,3,11,0,99,30,40,50])
+    [0, 4, 8]
+    >>> decode_straight_line([1,0,0,0,99], dynamic=(0,))
+    >>> decode_straight_line([3,0,0,0,99])
+    """
+    instructions = []
+    ptr = 0
+    while ptr < len(code_list):
+        if ptr in dynamic:
+            return None
+        code = code_list[ptr]
+        instructions.append(ptr)
+        if code == FinOpcode.opcode_id:
+            return instructions
+        if code not in (AddOpcode.opcode_id, MulOpcode.opcode_id) \
+           or ptr + 3 >= len(code_list):
+            return None
+        ptr += 4
+    return instructions if ptr == len(code_list) else None
+
+# Statements per generated function; huge code objects are slow to compile
+# and to trace
+COMPILE_BLOCK_SIZE = 1000
+
+def generate_source(code_list, instructions, dynamic):
+    """
+    >>> print(generate_source([1,9,10,3,2,3,11,0,99,30,40,50], [0, 4, 8], ()))
+    def block_0(m):
+        m[3] = m[9] + m[10]
+        m[0] = m[3] * m[11]
+    def compiled(m):
+        block_0(m)
+        return m
+    """
+    def operand(addr):
+        return 'm[m[{}]]'.format(addr) if addr in dynamic else 'm[{}]'.format(code_list[addr])
+
+    lines = []
+    blocks = 0
+    for i, ptr in enumerate(instructions):
+        code = code_list[ptr]
+        if code == FinOpcode.opcode_id:
+            break
+        if i % COMPILE_BLOCK_SIZE == 0:
+            lines.append('def block_{}(m):'.format(blocks))
+            blocks += 1
+        op = '+' if code == AddOpcode.opcode_id else '*'
+        expr = '{} {} {}'.format(operand(ptr + 1), op, operand(ptr + 2))
+        if ptr + 3 in dynamic:
+            lines.append('    t = m[{}]'.format(ptr + 3))
+            lines.append('    if t % {} in pending_{}: raise SelfModifyingProgram'.format(len(code_list), i))
+            lines.append('    m[t] = {}'.format(expr))
+        else:
+            lines.append('    m[{}] = {}'.format(code_list[ptr + 3], expr))
+    lines.append('def compiled(m):')
+    lines += ['    block_{}(m)'.format(b) for b in range(blocks)]
+    lines.append('    return m')
+    return '\n'.join(lines)
+
+def compile_program(code_list, dynamic=()):
+    """
+    Compiles a straight-line Intcode program into a Python function that
+    runs it on a memory list. Cells listed in `dynamic` may hold different
+    values at run time (e.g. noun and verb), so they are read from memory
+    instead of being baked in. Returns None when the program writes into
+    instructions that have not run yet.
+
+    >>> fn = compile_program([1,9,10,3,2,3,11,0,99,30,40,50])
+    >>> fn([1,9,10,3,2,3,11,0,99,30,40,50])
+    [3500, 9, 10, 70, 2, 3, 11, 0, 99, 30, 40, 50]
+    >>> compile_program([1,0,0,4,99]) is None
+    True
+    """
+    dynamic = frozenset(dynamic)
+    key = program_hash(code_list, dynamic)
+    if key in compiled_programs:
+        return compiled_programs[key]
+
+    compiled = None
+    instructions = decode_straight_line(code_list, dynamic)
+    if instructions is not None:
+        namespace = {'SelfModifyingProgram': SelfModifyingProgram}
+        last = instructions[-1] if instructions else -4
+        code_end = last + 1 if code_list[last:last + 1] == [FinOpcode.opcode_id] else last + 4
+        size = len(code_list)
+        # Cells of every instruction that has not run yet
+        pending = [range(ptr + 4, code_end) for ptr in instructions]
+        for i, ptr in enumerate(instructions):
+            if ptr + 3 in dynamic:
+                namespace['pending_{}'.format(i)] = pending[i]
+        static_writes = [(i, code_list[ptr + 3]) for i, ptr in enumerate(instructions)
+                         if code_list[ptr] != FinOpcode.opcode_id and ptr + 3 not in dynamic]
+        if not any(target % size in pending[i] for i, target in static_writes
+                   if -size <= target < size):
+            exec(generate_source(code_list, instructions, dynamic), namespace)
+            compiled = namespace['compiled']
+            compiled.guarded = any(ptr + 3 in dynamic for ptr in instructions)
+
+    compiled_programs[key] = compiled
+    return compiled
+
+def run_compiled(code_list, dynamic=()):
+    """
+    Runs a program through its compiled form, falling back to the
+    interpreter when that is not possible for this memory image.
+
+    >>> code_list = read_codes('day_2_input.txt')
+    >>> code_list[1], code_list[2] = 12, 2
+    >>> run_compiled(code_list, dynamic=(1, 2))[0]
+    4138658
+    >>> run_compiled([1,0,0,5,99,7])
+    [1, 0, 0, 5, 99, 2]
+    >>> program = [1,0,0,3,1,12,13,8,99,0,0,0,40,59]
+    >>> run_compiled(program[:], dynamic=(7,)) == parse_opcode(program[:])
+    True
+    """
+    compiled = compile_program(code_list, dynamic)
+    if compiled is None:
+        return run_program(code_list)
+    if not compiled.guarded:
+        return compiled(code_list)
+    original = code_list[:]
+    try:
+        return compiled(code_list)
+    except SelfModifyingProgram:
+        code_list[:] = original
+        return run_program(code_list)
+
+#------------------------------------------------------------------------------#
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+search_job = {}
+
+def init_search_worker(job, best_index):
+    search_job.update(job)
+    search_job['best_index'] = best_index
+
+def search_noun_row(noun_index):
+    """
+    Tries every verb for one noun and returns the flat index of the first
+    match, or None. Stops as soon as a match at an earlier index is known.
+    Candidates that crash the program count as no match.
+    """
+    job = search_job
+    best_index = job['best_index']
+    verbs = job['verbs']
+    base = noun_index * len(verbs)
+
+    code_list = job['code_list']
+    dynamic = (job['noun_addr'], job['verb_addr'])
+    noun = job['nouns'][noun_index]
+    for verb_index, verb in enumerate(verbs):
+        if base + verb_index > best_index.value:
+            return None
+        cpy_list = code_list[:]
+        cpy_list[job['noun_addr']] = noun
+        cpy_list[job['verb_addr']] = verb
+        try:
+            output = run_compiled(cpy_list, dynamic)[job['output_addr']]
+        except (IndexError, UnknownOpcodeError):
+            continue
+        if output == job['target']:
+            with best_index.get_lock():
+                best_index.value = min(best_index.value, base + verb_index)
+            return base + verb_index
+    return None
+
+def parallel_find_output(code_list, target, nouns=range(0,100), verbs=range(0,100),
+                         workers=None, noun_addr=1, verb_addr=2, output_addr=0):
+    """
+    Searches (noun, verb) pairs over a process pool, one noun per task, and
+    returns the pair a sequential noun-major scan would have found first,
+    or None. At most two rows per worker are queued at a time, and rows
+    after a known match are never submitted.
+
+    >>> code_list = read_codes('day_2_input.txt')
+    >>> parallel_find_output(code_list, 19690720, workers=4)
+    (72, 64)
+    >>> parallel_find_output(code_list, 4138658, nouns=range(5, 20), workers=2)
+    (12, 2)
+    >>> parallel_find_output(code_list, -1, nouns=range(3), verbs=range(3), workers=2)
+    """
+    nouns = list(nouns)
+    verbs = list(verbs)
+    if not nouns or not verbs:
+        return None
+    best_index = multiprocessing.Value('q', len(nouns) * len(verbs))
+    job = {
+        'code_list': list(code_list),
+        'target': target,
+        'nouns': nouns,
+        'verbs': verbs,
+        'noun_addr': noun_addr,
+        'verb_addr': verb_addr,
+        'output_addr': output_addr,
+    }
+    window = 2 * (workers or os.cpu_count() or 1)
+    found = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_search_worker,
+                             initargs=(job, best_index)) as executor:
+        pending = {}
+        next_row = 0
+        while True:
+            while (next_row < len(nouns) and len(pending) < window
+                   and next_row * len(verbs) <= best_index.value):
+                pending[executor.submit(search_noun_row, next_row)] = next_row
+                next_row += 1
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                del pending[future]
+                if future.result() is not None:
+                    found.append(future.result())
+            for future, row in list(pending.items()):
+                if row * len(verbs) > best_index.value and future.cancel():
+                    del pending[future]
+    if not found:
+        return None
+    noun_index, verb_index = divmod(min(found), len(verbs))
+    return (nouns[noun_index], verbs[verb_index])
+
+#------------------------------------------------------------------------------#
+class SymbolicPointerError(Exception):
+    pass
+
+class Poly:
+    """
+    Integer polynomial over named variables, stored as {monomial: coefficient}
+    where a monomial is a sorted tuple of variable names.
+
+    >>> x, y = Poly.var('x'), Poly.var('y')
+    >>> p = (x + 3) * y * 2 + x * x
+    >>> p.evaluate({'x': 2, 'y': 5})
+    54
+    >>> p.degree('y'), p.degree('x')
+    (1, 2)
+    """
+    def __init__(self, terms):
+        self.terms = {m: c for m, c in terms.items() if c != 0}
+
+    def __repr__(self):
+        return ' + '.join('*'.join([str(c)] * (c != 1 or not m) + list(m))
+                          for m, c in sorted(self.terms.items())) or '0'
+
+    @classmethod
+    def var(cls, name):
+        return cls({(name,): 1})
+
+    @staticmethod
+    def lift(value):
+        return value if isinstance(value, Poly) else Poly({(): value})
+
+    def __add__(self, other):
+        terms = dict(self.terms)
+        for m, c in Poly.lift(other).terms.items():
+            terms[m] = terms.get(m, 0) + c
+        return Poly(terms)
+
+    __radd__ = __add__
+
+    def __mul__(self, other):
+        terms = {}
+        for m1, c1 in self.terms.items():
+            for m2, c2 in Poly.lift(other).terms.items():
+                m = tuple(sorted(m1 + m2))
+                terms[m] = terms.get(m, 0) + c1 * c2
+        return Poly(terms)
+
+    __rmul__ = __mul__
+
+    def degree(self, name):
+        return max((m.count(name) for m in self.terms), default=0)
+
+    def evaluate(self, values):
+        total = 0
+        for m, c in self.terms.items():
+            for name in m:
+                c *= values[name]
+            total += c
+        return total
+
+    def substitute(self, name, value):
+        terms = {}
+        for m, c in self.terms.items():
+            c *= value ** m.count(name)
+            rest = tuple(v for v in m if v != name)
+            terms[rest] = terms.get(rest, 0) + c
+        return Poly(terms)
+
+    def coefficients(self, name):
+        coefs = [0] * (self.degree(name) + 1)
+        for m, c in self.terms.items():
+            coefs[m.count(name)] += c
+        return coefs
+
+class UnknownValue:
+    """Opaque result of reading through a symbolic pointer."""
+    def __repr__(self):
+        return 'UNKNOWN'
+
+UNKNOWN = UnknownValue()
+
+def run_symbolic(code_list, symbols, pointers=None):
+    """
+    Runs an add/mul program with the cells in `symbols` ({address: name})
+    replaced by variables. A read through a symbolic pointer stores
+    UNKNOWN and appends the pointer to `pointers`. SymbolicPointerError is
+    raised when a symbolic or unknown value is used as an opcode or a write
+    address, or when UNKNOWN is used as a read pointer.
+
+    >>> x = run_symbolic([1,9,10,3,2,3,11,0,99,30,40,50], {9: 'noun'})[0]
+    >>> x.coefficients('noun')
+    [2000, 50]
+    >>> pointers = []
+    >>> run_symbolic([1,1,0,5,99,0], {1: 'noun'}, pointers)[5], pointers
+    (UNKNOWN, [noun])
+    >>> run_symbolic([1,0,0,3,99], {3: 'noun'}) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    SymbolicPointerError: address 3 holds a symbolic value
+    """
+    mem = list(code_list)
+    for addr, name in symbols.items():
+        mem[addr] = Poly.var(name)
+    if pointers is None:
+        pointers = []
+
+    def concrete(addr):
+        value = mem[addr]
+        if isinstance(value, (Poly, UnknownValue)):
+            raise SymbolicPointerError('address {} holds a symbolic value'.format(addr))
+        return value
+
+    def read(addr):
+        pointer = mem[addr]
+        if isinstance(pointer, Poly):
+            pointers.append(pointer)
+            return UNKNOWN
+        return mem[concrete(addr)]
+
+    ptr = 0
+    while ptr != len(mem):
+        code = concrete(ptr)
+        if code == FinOpcode.opcode_id:
+            break
+        if code not in (AddOpcode.opcode_id, MulOpcode.opcode_id):
+            raise UnknownOpcodeError(code, ptr)
+        a = read(ptr + 1)
+        b = read(ptr + 2)
+        out = concrete(ptr + 3)
+        if a is UNKNOWN or b is UNKNOWN:
+            mem[out] = UNKNOWN
+        else:
+            mem[out] = a + b if code == AddOpcode.opcode_id else a * b
+        ptr += 4
+    return mem
+
+def integer_roots(coefs, target, candidates):
+    """
+    Yields, in order, the candidates x with sum(c * x**i) == target.
+
+    >>> list(integer_roots([4, 3], 19, range(10)))
+    [5]
+    >>> list(integer_roots([7], 7, range(3)))
+    [0, 1, 2]
+    """
+    constant = coefs[0] - target
+    if len(coefs) == 1:
+        if constant == 0:
+            yield from candidates
+    elif len(coefs) == 2:
+        slope = coefs[1]
+        if -constant % slope == 0 and -constant // slope in candidates:
+            yield -constant // slope
+    else:
+        for x in candidates:
+            if sum(c * x ** i for i, c in enumerate(coefs)) == target:
+                yield x
+
+def scan_noun_verb(code_list, target, nouns, verbs, noun_addr=1, verb_addr=2, output_addr=0):
+    """
+    Sequential noun-major search; candidates that crash count as no match.
+
+    >>> scan_noun_verb(read_codes('day_2_input.txt'), 4138658, range(100), range(100))
+    (12, 2)
+    """
+    for noun in nouns:
+        for verb in verbs:
+            cpy_list = code_list[:]
+            cpy_list[noun_addr] = noun
+            cpy_list[verb_addr] = verb
+            try:
+                output = run_program(cpy_list)[output_addr]
+            except (IndexError, UnknownOpcodeError):
+                continue
+            if output == target:
+                return (noun, verb)
+    return None
+
+def solve_noun_verb(code_list, target, nouns=range(0,100), verbs=range(0,100),
+                    noun_addr=1, verb_addr=2, output_addr=0, fallback=True):
+    """
+    Runs the program once with symbolic noun and verb and solves the
+    polynomial left at `output_addr` for the target. Reads through noun or
+    verb are allowed as long as their result is never used; a solution
+    must also keep those pointers inside memory. Falls back to a concrete
+    scan (or raises SymbolicPointerError without `fallback`) when the
+    symbolic run cannot decide the output.
+
+    >>> solve_noun_verb(read_codes('day_2_input.txt'), 19690720, fallback=False)
+    (72, 64)
+    >>> solve_noun_verb(read_codes('day_2_input.txt'), 4138658, fallback=False)
+    (12, 2)
+    >>> solve_noun_verb([1,0,0,0,99], 2, range(3), range(3))
+    (0, 0)
+    >>> solve_noun_verb([1,0,0,0,99], 5, range(3), range(3))
+    """
+    pointers = []
+    try:
+        mem = run_symbolic(code_list, {noun_addr: 'noun', verb_addr: 'verb'}, pointers)
+        if mem[output_addr] is UNKNOWN:
+            raise SymbolicPointerError('output address {} is unknown'.format(output_addr))
+    except (IndexError, UnknownOpcodeError):
+        # The control flow does not depend on noun or verb, so every
+        # candidate would crash the same way.
+        return None
+    except SymbolicPointerError:
+        if not fallback:
+            raise
+        return scan_noun_verb(list(code_list), target, nouns, verbs,
+                              noun_addr, verb_addr, output_addr)
+
+    def pointers_in_range(noun, verb):
+        values = {'noun': noun, 'verb': verb}
+        return all(-len(mem) <= pointer.evaluate(values) < len(mem) for pointer in pointers)
+
+    output = Poly.lift(mem[output_addr])
+    verbs = range(verbs.start, verbs.stop, verbs.step) if isinstance(verbs, range) else list(verbs)
+    for noun in nouns:
+        coefs = output.substitute('noun', noun).coefficients('verb')
+        for verb in integer_roots(coefs, target, verbs):
+            if pointers_in_range(noun, verb):
+                return (noun, verb)
+    return None
+
+#------------------------------------------------------------------------------#
+class IntcodeMemory:
+    """
+    Intcode memory in a compact array('q'). Values that do not fit in 64 bits
+    switch the storage to a plain list of ints. Writes after `snapshot()`
+    are journaled so `restore()` only touches the cells that changed.
+
+    >>> mem = IntcodeMemory([1,9,10,3,2,3,11,0,99,30,40,50])
+    >>> mem.snapshot()
+    >>> parse_opcode(mem)
+    IntcodeMemory([3500, 9, 10, 70, 2, 3, 11, 0, 99, 30, 40, 50])
+    >>> mem.restore()
+    >>> mem.tolist() == [1,9,10,3,2,3,11,0,99,30,40,50]
+    True
+    >>> mem[11] = 2**70
+    >>> mem.compact
+    False
+    >>> run_program(mem)[0] == 70 * 2**70
+    True
+    >>> mem.restore()
+    >>> mem[11], mem[0]
+    (50, 1)
+
+    Negative indices share a journal entry with their positive alias:
+
+    >>> mem = IntcodeMemory([1,0,0,-1,1,0,5,9,99,0])
+    >>> mem.snapshot()
+    >>> parse_opcode(mem)[-1]
+    1
+    >>> mem.restore()
+    >>> mem[-1]
+    0
+    >>> IntcodeMemory([99]).restore()
+    Traceback (most recent call last):
+    ...
+    ValueError: restore() called before snapshot()
+    """
+    def __init__(self, values):
+        try:
+            self.cells = array('q', values)
+        except OverflowError:
+            self.cells = list(values)
+        self.journal = None
+
+    @classmethod
+    def from_buffer(cls, cells):
+        """Wraps an existing int buffer (e.g. a memoryview) without copying."""
+        memory = cls.__new__(cls)
+        memory.cells = cells
+        memory.journal = None
+        return memory
+
+    @property
+    def compact(self):
+        return not isinstance(self.cells, list)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __getitem__(self, index):
+        return self.cells[index]
+
+    def __setitem__(self, index, value):
+        journal = self.journal
+        if journal is not None:
+            if not -len(self.cells) <= index < len(self.cells):
+                raise IndexError('memory index out of range')
+            index %= len(self.cells)
+            if index not in journal:
+                journal[index] = self.cells[index]
+        try:
+            self.cells[index] = value
+        except (OverflowError, ValueError):
+            self.cells = list(self.cells)
+            self.cells[index] = value
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return 'IntcodeMemory({})'.format(self.tolist())
+
+    def tolist(self):
+        return list(self.cells)
+
+    def snapshot(self):
+        self.journal = {}
+
+    def restore(self):
+        if self.journal is None:
+            raise ValueError('restore() called before snapshot()')
+        for index, value in self.journal.items():
+            self.cells[index] = value
+        self.journal = {}
+
+#------------------------------------------------------------------------------#
+import numpy as np
+from collections import namedtuple
+
+LockstepResult = namedtuple('LockstepResult', ['halted', 'memory', 'scalar', 'errors'])
+
+# Operands above these bounds may overflow int64, so such lanes go scalar
+ADD_OPERAND_LIMIT = 2**62
+MUL_OPERAND_LIMIT = 2**31
+
+def run_lockstep(images):
+    """
+    Runs N memory images of equal length in lockstep, one vectorized
+    add/mul per step across all lanes that share the instruction pointer.
+    Lanes that hit another opcode, an out-of-range address or a possible
+    int64 overflow are split out to the scalar interpreter.
+
+    Returns a halted mask, the final memory matrix (object dtype only when
+    a scalar lane outgrew int64), a mask of lanes that went scalar and a
+    {lane: message} dict for lanes that crashed.
+
+    >>> result = run_lockstep([[1,0,0,0,99], [2,0,0,0,99], [1,9,0,0,99]])
+    >>> result.halted.tolist(), result.scalar.tolist()
+    ([True, True, False], [False, False, True])
+    >>> result.memory[:2].tolist()
+    [[2, 0, 0, 0, 99], [4, 0, 0, 0, 99]]
+    >>> result.errors
+    {2: 'IndexError: list index out of range'}
+    >>> run_lockstep([[2,5,5,0,99,2**40]]).memory[0, 0] == 2**80
+    True
+    """
+    mem = np.array(images, dtype=np.int64)
+    lanes, length = mem.shape
+    halted_mask = np.zeros(lanes, dtype=bool)
+    scalar_mask = np.zeros(lanes, dtype=bool)
+    errors = {}
+    big_rows = {}
+
+    def go_scalar(lane_ids, ptr):
+        scalar_mask[lane_ids] = True
+        for lane in lane_ids:
+            memory = mem[lane].tolist()
+            try:
+                run_program(memory, ptr=ptr)
+                halted_mask[lane] = True
+            except Exception as e:
+                errors[int(lane)] = '{}: {}'.format(type(e).__name__, e)
+            try:
+                mem[lane] = memory
+            except OverflowError:
+                big_rows[lane] = memory
+
+    active = np.arange(lanes)
+    ptr = 0
+    while active.size:
+        if ptr == length:
+            halted_mask[active] = True
+            break
+        codes = mem[active, ptr]
+        halted = codes == FinOpcode.opcode_id
+        halted_mask[active[halted]] = True
+        arith = (codes == AddOpcode.opcode_id) | (codes == MulOpcode.opcode_id)
+        if ptr + 3 >= length:
+            go_scalar(active[arith], ptr)
+            arith[:] = False
+        go_scalar(active[~(halted | arith)], ptr)
+        active, codes = active[arith], codes[arith]
+        if not active.size:
+            break
+
+        params = mem[active, ptr + 1:ptr + 4]
+        in_range = ((params >= -length) & (params < length)).all(axis=1)
+        a = mem[active[:, None], np.where(in_range[:, None], params[:, :2], 0)]
+        limit = np.where(codes == MulOpcode.opcode_id, MUL_OPERAND_LIMIT, ADD_OPERAND_LIMIT)
+        safe = in_range & (np.abs(a) < limit[:, None]).all(axis=1)
+        go_scalar(active[~safe], ptr)
+        active, codes, params, a = active[safe], codes[safe], params[safe], a[safe]
+
+        values = np.where(codes == AddOpcode.opcode_id, a[:, 0] + a[:, 1], a[:, 0] * a[:, 1])
+        mem[active, params[:, 2]] = values
+        ptr += 4
+
+    if big_rows:
+        mem = mem.astype(object)
+        for lane, memory in big_rows.items():
+            mem[lane] = memory
+    return LockstepResult(halted_mask, mem, scalar_mask, errors)
+
+def batch_find_output(code_list, target, nouns=range(0,100), verbs=range(0,100),
+                      noun_addr=1, verb_addr=2, output_addr=0):
+    """
+    Runs every (noun, verb) candidate as one lockstep batch and returns the
+    first matching pair in noun-major order, or None.
+
+    >>> batch_find_output(read_codes('day_2_input.txt'), 19690720)
+    (72, 64)
+    """
+    nouns, verbs = np.asarray(nouns), np.asarray(verbs)
+    images = np.tile(np.asarray(code_list, dtype=np.int64), (nouns.size * verbs.size, 1))
+    images[:, noun_addr] = np.repeat(nouns, verbs.size)
+    images[:, verb_addr] = np.tile(verbs, nouns.size)
+    result = run_lockstep(images)
+    matches = np.flatnonzero(result.halted & (result.memory[:, output_addr] == target))
+    if not matches.size:
+        return None
+    lane = matches[0]
+    return (int(images[lane, noun_addr]), int(images[lane, verb_addr]))
+
+#------------------------------------------------------------------------------#
+import json
+import time
+from collections import Counter
+
+class CountingMemory:
+    """Memory proxy that counts reads and writes into an ExecutionStats."""
+    def __init__(self, memory, stats):
+        self.memory = memory
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.memory)
+
+    def __getitem__(self, index):
+        self.stats.reads += 1
+        return self.memory[index]
+
+    def __setitem__(self, index, value):
+        self.stats.writes += 1
+        self.memory[index] = value
+
+class ExecutionStats:
+    """
+    >>> stats = ExecutionStats()
+    >>> run_instrumented([1,9,10,3,2,3,11,0,99,30,40,50], stats)
+    [3500, 9, 10, 70, 2, 3, 11, 0, 99, 30, 40, 50]
+    >>> d = stats.to_dict()
+    >>> d['opcode_counts'], d['hot_addresses'], d['instructions'], d['runs']
+    ({1: 1, 2: 1, 99: 1}, {0: 1, 4: 1, 8: 1}, [3], 1)
+    >>> d['reads'], d['writes']
+    (13, 2)
+    >>> 'wall_time' in json.loads(stats.to_json())
+    True
+    """
+    def __init__(self):
+        self.opcode_counts = Counter()
+        self.hot_addresses = Counter()
+        self.reads = 0
+        self.writes = 0
+        self.instructions = []
+        self.wall_time = []
+
+    def to_dict(self):
+        return {
+            'opcode_counts': dict(self.opcode_counts),
+            'hot_addresses': dict(self.hot_addresses.most_common()),
+            'reads': self.reads,
+            'writes': self.writes,
+            'instructions': list(self.instructions),
+            'wall_time': list(self.wall_time),
+            'runs': len(self.instructions),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+def run_instrumented(code_list, stats=None, trace=None, dispatch=None):
+    """
+    Runs a program like run_program while collecting ExecutionStats and
+    calling `trace(ptr, opcode, memory)` before every instruction. Without
+    stats or trace it is run_program itself, so disabled instrumentation
+    costs one check per run.
+
+    >>> seen = []
+    >>> run_instrumented([1,0,0,0,99], trace=lambda ptr, code, mem: seen.append((ptr, code)))
+    [2, 0, 0, 0, 99]
+    >>> seen
+    [(0, 1), (4, 99)]
+    """
+    if stats is None and trace is None:
+        return run_program(code_list, dispatch)
+    if stats is None:
+        stats = ExecutionStats()
+    if dispatch is None:
+        dispatch = default_dispatch()
+
+    memory = CountingMemory(code_list, stats)
+    opcode_counts = stats.opcode_counts
+    hot_addresses = stats.hot_addresses
+    count = 0
+    start = time.perf_counter()
+    try:
+        ptr = 0
+        end = len(code_list)
+        while ptr != end:
+            code = memory[ptr]
+            handler = dispatch.get(code)
+            if handler is None:
+                raise UnknownOpcodeError(code, ptr)
+            if trace is not None:
+                trace(ptr, code, code_list)
+            opcode_counts[code] += 1
+            hot_addresses[ptr] += 1
+            count += 1
+            ptr = handler(ptr, memory)
+    finally:
+        stats.instructions.append(count)
+        stats.wall_time.append(time.perf_counter() - start)
+    return code_list
+
+#------------------------------------------------------------------------------#
+import random
+import tracemalloc
+
+def generate_program(instructions, spread=64, self_modify_rate=0.0, seed=0):
+    """
+    Generates a valid add/mul/halt program. Operands are read from a
+    read-only region of `spread` cells holding addresses into that same
+    region, and results go to a small sink region, so values stay bounded.
+    With `self_modify_rate`, an instruction instead rewrites the first
+    operand of a later instruction with another valid address.
+
+    >>> program = generate_program(50, spread=8, self_modify_rate=0.2, seed=1)
+    >>> len(program)
+    226
+    >>> run_program(program[:]) == parse_opcode(program[:])
+    True
+    """
+    rng = random.Random(seed)
+    halt = 4 * instructions
+    base = halt + 1
+    zero = base + spread
+    sink = zero + 1
+    sink_size = 16
+
+    program = []
+    for i in range(instructions):
+        if i + 1 < instructions and rng.random() < self_modify_rate:
+            later = rng.randrange(i + 1, instructions)
+            program += [AddOpcode.opcode_id, base + rng.randrange(spread), zero, 4 * later + 1]
+        else:
+            program += [rng.choice((AddOpcode.opcode_id, MulOpcode.opcode_id)),
+                        base + rng.randrange(spread), base + rng.randrange(spread),
+                        sink + rng.randrange(sink_size)]
+    program.append(FinOpcode.opcode_id)
+    program += [base + rng.randrange(spread) for _ in range(spread)]
+    program.append(0)
+    program += [0] * sink_size
+    return program
+
+default_engines = {
+    'parse_opcode': parse_opcode,
+    'run_program': run_program,
+    'run_compiled': lambda memory: run_compiled(memory, dynamic=(1, 2)),
+}
+
+def benchmark_engine(engine, program, repeat=3, search_runs=100):
+    """
+    Times one engine on one program: the first run on its own (it pays
+    one-off costs such as compilation), then best-of-`repeat` instructions
+    per second and peak traced memory of warm runs, and patched runs per
+    second for a find_output-style search over the first instruction's
+    operands.
+
+    >>> result = benchmark_engine(run_compiled, generate_program(instructions=50, seed=3), 1, 2)
+    >>> result['first_run_seconds'] >= result['seconds']
+    True
+    """
+    stats = ExecutionStats()
+    run_instrumented(program[:], stats)
+    instructions = stats.instructions[0]
+
+    start = time.perf_counter()
+    engine(program[:])
+    first_run = time.perf_counter() - start
+
+    best = float('inf')
+    for _ in range(repeat):
+        memory = program[:]
+        start = time.perf_counter()
+        engine(memory)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    engine(program[:])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Alternate between the original and swapped operands of instruction 0
+    patches = [(program[1], program[2]), (program[2], program[1])]
+    memory = program[:]
+    memory[1], memory[2] = patches[1]
+    engine(memory)
+    start = time.perf_counter()
+    for run in range(search_runs):
+        memory = program[:]
+        memory[1], memory[2] = patches[run % 2]
+        engine(memory)
+    search_time = time.perf_counter() - start
+
+    return {
+        'instructions': instructions,
+        'first_run_seconds': first_run,
+        'seconds': best,
+        'instructions_per_second': instructions / best if best else float('inf'),
+        'peak_bytes': peak,
+        'search_runs_per_second': search_runs / search_time if search_time else float('inf'),
+    }
+
+def run_benchmarks(workloads, engines=None, repeat=3, search_runs=100):
+    """
+    Benchmarks every engine on every workload. `workloads` maps a name to
+    keyword arguments for generate_program. Returns a JSON-serializable
+    {workload: {engine: result}} dict.
+
+    >>> results = run_benchmarks({'tiny': {'instructions': 20}}, repeat=1, search_runs=2)
+    >>> sorted(results['tiny'])
+    ['parse_opcode', 'run_compiled', 'run_program']
+    >>> results['tiny']['run_program']['instructions']
+    21
+    """
+    engines = engines or default_engines
+    results = {}
+    for name, params in workloads.items():
+        program = generate_program(**params)
+        results[name] = {engine_name: benchmark_engine(engine, program, repeat, search_runs)
+                         for engine_name, engine in engines.items()}
+    return results
+
+def compare_with_baseline(results, baseline, tolerance=0.1):
+    """
+    Lists (workload, engine, metric, baseline, current) for every throughput
+    metric that dropped more than `tolerance` below the baseline.
+
+    >>> base = {'w': {'e': {'instructions_per_second': 100.0, 'search_runs_per_second': 10.0}}}
+    >>> now = {'w': {'e': {'instructions_per_second': 80.0, 'search_runs_per_second': 10.0}}}
+    >>> compare_with_baseline(now, base)
+    [('w', 'e', 'instructions_per_second', 100.0, 80.0)]
+    """
+    regressions = []
+    for workload, engines in results.items():
+        for engine, result in engines.items():
+            previous = baseline.get(workload, {}).get(engine)
+            if previous is None:
+                continue
+            for metric in ('instructions_per_second', 'search_runs_per_second'):
+                if result[metric] < previous[metric] * (1 - tolerance):
+                    regressions.append((workload, engine, metric, previous[metric], result[metric]))
+    return regressions
+
+def save_benchmarks(results, filename):
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=2)
+
+def load_benchmarks(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+#------------------------------------------------------------------------------#
+import sqlite3
+from collections import OrderedDict
+
+class ResultCache:
+    """
+    Results of Intcode runs keyed by program hash, address patches and the
+    selected output addresses. A small in-process LRU sits in front of a
+    sqlite table that is itself LRU-bounded to `max_entries`.
+
+    >>> cache = ResultCache(':memory:', max_entries=2, memory_entries=1)
+    >>> gravity_assist_program(cache)
+    4138658
+    >>> gravity_assist_program(cache)
+    4138658
+    >>> cache.run([1,0,0,0,99], {}, outputs=(0,))
+    [2]
+    >>> cache.run([2,0,0,0,99], {})
+    [4, 0, 0, 0, 99]
+    >>> len(cache), cache.evictions
+    (2, 1)
+    >>> cache.run([1,0,0,0,99], {}, outputs=(0,))
+    [2]
+    >>> cache.stats()
+    {'memory_hits': 1, 'disk_hits': 1, 'misses': 3, 'evictions': 1, 'entries': 2}
+    >>> find_output(target=4138658, nouns=range(12, 13), verbs=range(3), cache=cache)
+    1202
+
+    Disk hits commit their recency, so other connections are not locked out:
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite')
+    >>> first = ResultCache(path, memory_entries=0)
+    >>> first.run([1,0,0,0,99], {}, outputs=(0,)), first.run([1,0,0,0,99], {}, outputs=(0,))
+    ([2], [2])
+    >>> second = ResultCache(path, max_entries=3)
+    >>> second.run([2,0,0,0,99], {}, outputs=(0,)), len(second)
+    ([4], 2)
+
+    Both caches keep one count and one clock in the shared file:
+
+    >>> first.max_entries = 3
+    >>> for n in range(3):
+    ...     _ = first.run([1,0,0,0,99,0], {5: n}), second.run([1,0,0,0,99,0], {5: 10 + n})
+    >>> len(first), len(second)
+    (3, 3)
+    >>> [row[0] for row in first.db.execute('SELECT last_used FROM results ORDER BY last_used')]
+    [7, 8, 9]
+    >>> first.close(); second.close()
+    """
+    def __init__(self, path='intcode_cache.sqlite', max_entries=100000, memory_entries=1024):
+        # Autocommit; store() opens its own write transaction
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute('CREATE TABLE IF NOT EXISTS results '
+                        '(key TEXT PRIMARY KEY, value TEXT, last_used INTEGER)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)')
+        self.db.execute("INSERT OR IGNORE INTO meta VALUES ('entries', (SELECT COUNT(*) FROM results))")
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return self.db.execute("SELECT value FROM meta WHERE name = 'entries'").fetchone()[0]
+
+    @staticmethod
+    def make_key(code_list, patches, outputs):
+        patches = sorted(patches.items())
+        return hashlib.sha256(repr((program_hash(code_list), patches, outputs)).encode()).hexdigest()
+
+    def remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def lookup(self, key):
+        if key in self.memory:
+            self.memory_hits += 1
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        row = self.db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self.db.execute('UPDATE results SET last_used = '
+                        '(SELECT MAX(last_used) + 1 FROM results) WHERE key = ?', (key,))
+        value = json.loads(row[0])
+        self.remember(key, value)
+        return value
+
+    def store(self, key, value):
+        """
+        Inserts or refreshes one result. The clock, the entry count and the
+        eviction all happen in one write transaction, so several caches can
+        share a file.
+        """
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            clock = db.execute('SELECT COALESCE(MAX(last_used), 0) + 1 FROM results').fetchone()[0]
+            try:
+                db.execute('INSERT INTO results VALUES (?, ?, ?)', (key, json.dumps(value), clock))
+                db.execute("UPDATE meta SET value = value + 1 WHERE name = 'entries'")
+            except sqlite3.IntegrityError:
+                db.execute('UPDATE results SET value = ?, last_used = ? WHERE key = ?',
+                           (json.dumps(value), clock, key))
+            entries = db.execute("SELECT value FROM meta WHERE name = 'entries'").fetchone()[0]
+            if entries > self.max_entries:
+                deleted = db.execute('DELETE FROM results WHERE key IN '
+                                     '(SELECT key FROM results ORDER BY last_used LIMIT ?)',
+                                     (entries - self.max_entries,)).rowcount
+                db.execute("UPDATE meta SET value = value - ? WHERE name = 'entries'", (deleted,))
+                self.evictions += deleted
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self.remember(key, value)
+
+    def run(self, code_list, patches, outputs=None, engine=run_program):
+        """
+        Returns the cells at `outputs` (or the whole final memory) after
+        running `code_list` with `patches` ({address: value}) applied.
+        """
+        outputs = tuple(outputs) if outputs is not None else None
+        key = self.make_key(code_list, patches, outputs)
+        value = self.lookup(key)
+        if value is None:
+            memory = list(code_list)
+            for addr, patch in patches.items():
+                memory[addr] = patch
+            memory = list(engine(memory))
+            value = memory if outputs is None else [memory[addr] for addr in outputs]
+            self.store(key, value)
+        return list(value)
+
+    def stats(self):
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self),
+        }
+
+    def close(self):
+        self.db.close()
+
+#------------------------------------------------------------------------------#
+import mmap
+import struct
+import sys
+
+# Magic, cell width in bytes, cell count; cells follow as little-endian ints
+PROGRAM_HEADER = struct.Struct('<4sBxxxQ')
+PROGRAM_MAGIC = b'ICP1'
+CELL_FORMATS = {4: 'i', 8: 'q'}
+
+def iter_text_codes(filename, chunk_size=1 << 20):
+    """
+    Yields the integers of a comma-separated program without holding the
+    whole text in memory.
+
+    >>> list(iter_text_codes('day_2_input.txt', chunk_size=7))[:5]
+    [1, 0, 0, 3, 1]
+    """
+    remainder = ''
+    with open(filename, 'r') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            *fields, remainder = (remainder + chunk).split(',')
+            for field in fields:
+                yield int(field)
+    if remainder.strip():
+        yield int(remainder)
+
+def convert_codes(text_filename, binary_filename, width=8, chunk_cells=1 << 16):
+    """
+    Converts a comma-separated program into the binary program format and
+    returns the number of cells written.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'day_2.icp')
+    >>> convert_codes('day_2_input.txt', path, width=4)
+    145
+    >>> load_program(path).tolist()[:5]
+    [1, 0, 0, 3, 1]
+    """
+    cell_format = CELL_FORMATS[width]
+    count = 0
+    with open(binary_filename, 'wb') as f:
+        f.write(PROGRAM_HEADER.pack(PROGRAM_MAGIC, width, 0))
+        cells = array(cell_format)
+        for code in iter_text_codes(text_filename):
+            try:
+                cells.append(code)
+            except OverflowError:
+                raise ValueError('cell {} ({}) does not fit in {} bytes'.format(count, code, width))
+            count += 1
+            if len(cells) == chunk_cells:
+                write_cells(f, cells)
+                cells = array(cell_format)
+        write_cells(f, cells)
+        f.seek(0)
+        f.write(PROGRAM_HEADER.pack(PROGRAM_MAGIC, width, count))
+    return count
+
+def write_cells(f, cells):
+    if sys.byteorder != 'little':
+        cells.byteswap()
+    cells.tofile(f)
+
+def load_program(filename):
+    """
+    Memory-maps a binary program copy-on-write and returns it as an
+    IntcodeMemory; pages are only copied once they are written.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'day_2.icp')
+    >>> _ = convert_codes('day_2_input.txt', path)
+    >>> memory = load_program(path)
+    >>> memory[1], memory[2] = 12, 2
+    >>> run_program(memory)[0]
+    4138658
+    >>> load_program(path)[0]
+    1
+    """
+    with open(filename, 'rb') as f:
+        header = f.read(PROGRAM_HEADER.size)
+        magic, width, count = PROGRAM_HEADER.unpack(header)
+        if magic != PROGRAM_MAGIC or width not in CELL_FORMATS:
+            raise ValueError('{} is not a binary Intcode program'.format(filename))
+        if count == 0:
+            return IntcodeMemory([])
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    end = PROGRAM_HEADER.size + count * width
+    if sys.byteorder != 'little':
+        cells = array(CELL_FORMATS[width], mapped[PROGRAM_HEADER.size:end])
+        cells.byteswap()
+        return IntcodeMemory(cells)
+    view = memoryview(mapped)[PROGRAM_HEADER.size:end].cast(CELL_FORMATS[width])
+    return IntcodeMemory.from_buffer(view)
+
+#------------------------------------------------------------------------------#
+import asyncio
+from collections import deque
+
+class IntcodeVM:
+    """
+    Resumable VM: `run_slice` executes at most `max_steps` instructions and
+    keeps the instruction pointer and memory for the next call.
+
+    >>> vm = IntcodeVM([1,9,10,3,2,3,11,0,99,30,40,50])
+    >>> vm.run_slice(1), vm.ptr, vm.memory[3]
+    (False, 4, 70)
+    >>> vm.run_slice(10), vm.memory[0], vm.steps
+    (True, 3500, 3)
+    """
+    __slots__ = ('memory', 'ptr', 'steps', 'halted', 'error')
+
+    def __init__(self, memory):
+        self.memory = memory
+        self.ptr = 0
+        self.steps = 0
+        self.halted = False
+        self.error = None
+
+    @property
+    def done(self):
+        return self.halted or self.error is not None
+
+    def run_slice(self, max_steps, dispatch=None):
+        if dispatch is None:
+            dispatch = default_dispatch()
+        memory = self.memory
+        get_handler = dispatch.get
+        ptr = self.ptr
+        end = len(memory)
+        steps = 0
+        try:
+            while steps < max_steps:
+                if ptr == end:
+                    self.halted = True
+                    break
+                handler = get_handler(memory[ptr])
+                if handler is None:
+                    raise UnknownOpcodeError(memory[ptr], ptr)
+                ptr = handler(ptr, memory)
+                steps += 1
+            else:
+                self.halted = ptr == end
+        except Exception as e:
+            self.error = e
+        self.ptr = ptr
+        self.steps += steps
+        return self.halted
+
+class Scheduler:
+    """
+    Round-robins many IntcodeVMs on one thread, `slice_size` instructions
+    at a time, and collects them in completion order.
+
+    >>> scheduler = Scheduler(slice_size=2)
+    >>> long_vm = scheduler.submit(IntcodeVM(generate_program(10)))
+    >>> short_vm = scheduler.submit(IntcodeVM([1,0,0,0,99]))
+    >>> bad_vm = scheduler.submit(IntcodeVM([7,0,0,0]))
+    >>> [vm is short_vm for vm in scheduler.run()]
+    [True, False, False]
+    >>> scheduler.completed[2] is long_vm, type(bad_vm.error).__name__
+    (True, 'UnknownOpcodeError')
+    >>> metrics = scheduler.metrics()
+    >>> metrics['instructions'], metrics['completed'], metrics['queue_depth'], metrics['max_queue_depth']
+    (13, 3, 0, 3)
+    >>> scheduler = Scheduler(slice_size=2)
+    >>> vm = scheduler.submit(IntcodeVM([2,4,4,5,99,0]))
+    >>> asyncio.run(scheduler.run_async())[0].memory
+    [2, 4, 4, 5, 99, 9801]
+    """
+    def __init__(self, slice_size=1000, dispatch=None):
+        self.slice_size = slice_size
+        self.dispatch = dispatch or default_dispatch()
+        self.queue = deque()
+        self.completed = []
+        self.instructions = 0
+        self.slices = 0
+        self.max_queue_depth = 0
+        self.elapsed = 0.0
+
+    def submit(self, vm):
+        self.queue.append(vm)
+        self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+        return vm
+
+    def step(self):
+        """Gives the VM at the head of the queue one slice."""
+        vm = self.queue.popleft()
+        start = time.perf_counter()
+        before = vm.steps
+        vm.run_slice(self.slice_size, self.dispatch)
+        self.elapsed += time.perf_counter() - start
+        self.instructions += vm.steps - before
+        self.slices += 1
+        if vm.done:
+            self.completed.append(vm)
+        else:
+            self.queue.append(vm)
+        return vm
+
+    def run(self):
+        while self.queue:
+            self.step()
+        return self.completed
+
+    async def run_async(self, slices_per_yield=1):
+        """Like run, but yields to the event loop every few slices."""
+        while self.queue:
+            for _ in range(slices_per_yield):
+                if not self.queue:
+                    break
+                self.step()
+            await asyncio.sleep(0)
+        return self.completed
+
+    def metrics(self):
+        return {
+            'instructions': self.instructions,
+            'slices': self.slices,
+            'completed': len(self.completed),
+            'queue_depth': len(self.queue),
+            'max_queue_depth': self.max_queue_depth,
+            'instructions_per_second': self.instructions / self.elapsed if self.elapsed else 0.0,
+        }
+
 #------------------------------------------------------------------------------#
 if __name__ == "__main__":
     import doctest
@@ -196,10 +196,10 @@ def find_manhattan_distance(seq_a, seq_b):
         ['U98','R91','D20','R16','D67','R40','U7','R15','U6','R7'])
     135
     """
-    node_seq_a = parse_input_sequence(seq_a)
-    node_seq_b = parse_input_sequence(seq_b)
+    wire_a = Wire.from_moves(seq_a)
+    wire_b = Wire.from_moves(seq_b)
 
-    intersections = find_intersections(node_seq_a, node_seq_b)
+    intersections = sweep_find_intersections(wire_a, wire_b)
 
     nearest_node = find_minimal_tuple_sum(intersections)
 
@@ -251,34 +251,26 @@ def compute_cost(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
 def find_intersection_costs(node_seq_a, node_seq_b):
-    prev_node_a = node_seq_a[0]
-    prev_node_b = node_seq_b[0]
-    cost_a = 0
-    cost_b = 0
+    """
+    >>> find_intersection_costs([(0,0),(8,0),(8,5),(3,5),(3,2)],[(0,0),(0,7),(6,7),(6,3),(2,3)])
+    [(15, 15), (20, 20)]
+    """
+    wire_a = Wire(node_seq_a)
+    wire_b = Wire(node_seq_b)
 
     intersection_costs = []
 
-    for node_a in node_seq_a[1:]:
-        for node_b in node_seq_b[1:]:
+    for i, (prev_node_a, node_a) in enumerate(zip(node_seq_a, node_seq_a[1:])):
+        for j, (prev_node_b, node_b) in enumerate(zip(node_seq_b, node_seq_b[1:])):
             intersection = linear_interp_intersect([prev_node_a, node_a], [prev_node_b, node_b])
 
-            if intersection:
-                intersection_costs.append((compute_cost(prev_node_a, intersection) + cost_a, \
-                                          compute_cost(prev_node_b, intersection) + cost_b))
-
             # Check reverse
-            intersection = linear_interp_intersect([prev_node_b, node_b], [prev_node_a, node_a])
+            if not intersection:
+                intersection = linear_interp_intersect([prev_node_b, node_b], [prev_node_a, node_a])
 
             if intersection:
-                intersection_costs.append((compute_cost(prev_node_a, intersection) + cost_a, \
-                                          compute_cost(prev_node_b, intersection) + cost_b))
-
-            cost_b += compute_cost(prev_node_b, node_b)
-            prev_node_b = node_b
-        cost_a += compute_cost(prev_node_a, node_a)
-        prev_node_a = node_a
-        prev_node_b = node_seq_b[0]
-        cost_b = 0
+                intersection_costs.append((wire_a.steps_at(i, intersection),
+                                           wire_b.steps_at(j, intersection)))
 
     return intersection_costs
 
@@ -296,10 +288,8 @@ def find_closest_by_wire(seq_a, seq_b):
         ['U98','R91','D20','R16','D67','R40','U7','R15','U6','R7'])
     410
     """
-    node_seq_a = parse_input_sequence(seq_a)
-    node_seq_b = parse_input_sequence(seq_b)
-
-    intersection_costs = find_intersection_costs(node_seq_a, node_seq_b)
+    intersection_costs = sweep_find_intersection_costs(Wire.from_moves(seq_a),
+                                                       Wire.from_moves(seq_b))
 
     return find_minimal_tuple_sum(intersection_costs)
 
@@ -311,6 +301,793 @@ def find_closest_fuel_wire():
     codes = read_codes('day_3_input.txt')
     return find_closest_by_wire(codes[0], codes[1])
 
+#------------------------------------------------------------------------------#
+from bisect import bisect_left, bisect_right
+
+class FenwickTree:
+    """
+    Counts over positions 0..size-1 with O(log n) update, prefix count and
+    k-th present position.
+
+    >>> tree = FenwickTree(8)
+    >>> for i in (1, 4, 6):
+    ...     tree.add(i, 1)
+    >>> tree.prefix(5), tree.find(1)
+    (2, 4)
+    """
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.top = 1 << size.bit_length()
+
+    def add(self, i, delta):
+        i += 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Sum of positions 0..i-1."""
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k):
+        """Position of the k-th (0-based) present element."""
+        pos = 0
+        step = self.top
+        while step:
+            if pos + step <= self.size and self.tree[pos + step] <= k:
+                pos += step
+                k -= self.tree[pos]
+            step >>= 1
+        return pos
+
+def sweep_crossings(horizontal, vertical):
+    """
+    Yields (h_index, v_index, x, y) for every strictly interior crossing of
+    a horizontal and a vertical segment, sweeping a vertical line over x.
+    Active horizontals live in a Fenwick tree over their sorted (y, index)
+    keys, so the sweep takes O((n + k) log n) for n segments and k crossings.
+
+    >>> sorted(sweep_crossings([(1, -2, 2, 0)], [(0, 0, 5, 7), (2, 0, 5, 8)]))
+    [(0, 7, 0, 1)]
+    """
+    # At equal x: drop ended segments, then query, then add new ones
+    keys = sorted((y, index) for y, _, _, index in horizontal)
+    slot = {key: i for i, key in enumerate(keys)}
+    events = []
+    for y, x_lo, x_hi, index in horizontal:
+        events.append((x_lo, 2, y, index))
+        events.append((x_hi, 0, y, index))
+    for x, y_lo, y_hi, index in vertical:
+        events.append((x, 1, y_lo, y_hi, index))
+    events.sort()
+
+    active = FenwickTree(len(keys))
+    for event in events:
+        x, kind = event[0], event[1]
+        if kind == 2:
+            active.add(slot[event[2], event[3]], 1)
+        elif kind == 0:
+            active.add(slot[event[2], event[3]], -1)
+        else:
+            _, _, y_lo, y_hi, v_index = event
+            lo = active.prefix(bisect_right(keys, (y_lo, float('inf'))))
+            hi = active.prefix(bisect_left(keys, (y_hi, float('-inf'))))
+            for rank in range(lo, hi):
+                y, h_index = keys[active.find(rank)]
+                yield (h_index, v_index, x, y)
+
+def sweep_wire_crossings(wire_a, wire_b):
+    """
+    Returns (a_index, b_index, point) for every crossing of two Wires,
+    in the order the pairwise loop of find_intersections visits them.
+    """
+    a_horizontal, a_vertical = wire_a.split_segments()
+    b_horizontal, b_vertical = wire_b.split_segments()
+    crossings = [(a, b, (x, y)) for a, b, x, y in sweep_crossings(a_horizontal, b_vertical)]
+    crossings += [(a, b, (x, y)) for b, a, x, y in sweep_crossings(b_horizontal, a_vertical)]
+    crossings.sort()
+    return crossings
+
+def sweep_find_intersections(wire_a, wire_b):
+    """
+    >>> sweep_find_intersections(Wire([(5,5), (-5,5)]), Wire([(0,10), (0,0)]))
+    [(0, 5)]
+    >>> sweep_find_intersections(Wire([(5,5), (5,0)]), Wire([(10,0), (0,0)]))
+    []
+    >>> sweep_find_intersections(Wire([(0,0),(8,0),(8,5),(3,5),(3,2)]),
+    ...                          Wire([(0,0),(0,7),(6,7),(6,3),(2,3)]))
+    [(6, 5), (3, 3)]
+    """
+    return [point for _, _, point in sweep_wire_crossings(wire_a, wire_b)]
+
+def sweep_find_intersection_costs(wire_a, wire_b):
+    """
+    >>> sweep_find_intersection_costs(Wire([(0,0),(8,0),(8,5),(3,5),(3,2)]),
+    ...                               Wire([(0,0),(0,7),(6,7),(6,3),(2,3)]))
+    [(15, 15), (20, 20)]
+    """
+    return [(wire_a.steps_at(a, point), wire_b.steps_at(b, point))
+            for a, b, point in sweep_wire_crossings(wire_a, wire_b)]
+
+#------------------------------------------------------------------------------#
+import numpy as np
+
+# Bytes of temporaries per tested segment pair (int64 broadcasts and masks)
+BYTES_PER_PAIR = 32
+
+def segment_columns(segments):
+    """Turns (c, lo, hi, index) tuples into four int64 columns."""
+    columns = np.array(segments, dtype=np.int64).reshape(-1, 4)
+    return columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3]
+
+def tiled_crossings(horizontal, vertical, memory_budget):
+    """
+    Tests horizontal against vertical segments in tiles of at most
+    memory_budget / BYTES_PER_PAIR pairs and returns (h_index, v_index, x, y)
+    arrays of the strictly interior crossings.
+    """
+    y, x_lo, x_hi, h_index = segment_columns(horizontal)
+    x, y_lo, y_hi, v_index = segment_columns(vertical)
+    tile_pairs = max(1, memory_budget // BYTES_PER_PAIR)
+    tile_h = max(1, min(len(y), int(np.sqrt(tile_pairs))))
+    tile_v = max(1, min(len(x), tile_pairs // tile_h))
+
+    found = []
+    for i in range(0, len(y), tile_h):
+        ty = y[i:i + tile_h, None]
+        t_lo, t_hi = x_lo[i:i + tile_h, None], x_hi[i:i + tile_h, None]
+        for j in range(0, len(x), tile_v):
+            tx = x[None, j:j + tile_v]
+            mask = (t_lo < tx) & (tx < t_hi) \
+                 & (y_lo[None, j:j + tile_v] < ty) & (ty < y_hi[None, j:j + tile_v])
+            rows, cols = np.nonzero(mask)
+            if rows.size:
+                found.append((h_index[i + rows], v_index[j + cols],
+                              x[j + cols], y[i + rows]))
+    if not found:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    return tuple(np.concatenate(column) for column in zip(*found))
+
+def vector_wire_crossings(wire_a, wire_b, memory_budget=64 << 20):
+    """
+    Returns (x, y, cost_a, cost_b) arrays for every crossing of two Wires,
+    ordered like find_intersection_costs.
+
+    >>> x, y, cost_a, cost_b = vector_wire_crossings(Wire([(0,0),(8,0),(8,5),(3,5),(3,2)]),
+    ...     Wire([(0,0),(0,7),(6,7),(6,3),(2,3)]), memory_budget=32)
+    >>> x.tolist(), y.tolist(), (cost_a + cost_b).tolist()
+    ([6, 3], [5, 3], [30, 40])
+    """
+    a_horizontal, a_vertical = wire_a.split_segments()
+    b_horizontal, b_vertical = wire_b.split_segments()
+    a1, b1, x1, y1 = tiled_crossings(a_horizontal, b_vertical, memory_budget)
+    b2, a2, x2, y2 = tiled_crossings(b_horizontal, a_vertical, memory_budget)
+    a_index = np.concatenate([a1, a2])
+    b_index = np.concatenate([b1, b2])
+    x = np.concatenate([x1, x2])
+    y = np.concatenate([y1, y2])
+    order = np.lexsort((b_index, a_index))
+    a_index, b_index, x, y = a_index[order], b_index[order], x[order], y[order]
+
+    def costs(wire, index):
+        xs, ys, steps = (np.asarray(column, dtype=np.int64) for column in (wire.xs, wire.ys, wire.steps))
+        return steps[index] + np.abs(x - xs[index]) + np.abs(y - ys[index])
+
+    return x, y, costs(wire_a, a_index), costs(wire_b, b_index)
+
+def vector_find_manhattan_distance(seq_a, seq_b, memory_budget=64 << 20):
+    """
+    >>> vector_find_manhattan_distance( \
+        ['R8','U5','L5','D3'],['U7','R6','D4','L4'])
+    6
+    >>> vector_find_manhattan_distance( \
+        ['R75','D30','R83','U83','L12','D49','R71','U7','L72'], \
+        ['U62','R66','U55','R34','D71','R55','D58','R83'], memory_budget=256)
+    159
+    >>> vector_find_manhattan_distance( \
+        ['R98','U47','R26','D63','R33','U87','L62','D20','R33','U53','R51'], \
+        ['U98','R91','D20','R16','D67','R40','U7','R15','U6','R7'])
+    135
+    """
+    x, y, _, _ = vector_wire_crossings(Wire.from_moves(seq_a), Wire.from_moves(seq_b),
+                                       memory_budget)
+    return int((np.abs(x) + np.abs(y)).min())
+
+def vector_find_closest_by_wire(seq_a, seq_b, memory_budget=64 << 20):
+    """
+    >>> vector_find_closest_by_wire( \
+        ['R8','U5','L5','D3'],['U7','R6','D4','L4'])
+    30
+    >>> vector_find_closest_by_wire( \
+        ['R75','D30','R83','U83','L12','D49','R71','U7','L72'], \
+        ['U62','R66','U55','R34','D71','R55','D58','R83'], memory_budget=256)
+    610
+    >>> vector_find_closest_by_wire( \
+        ['R98','U47','R26','D63','R33','U87','L62','D20','R33','U53','R51'], \
+        ['U98','R91','D20','R16','D67','R40','U7','R15','U6','R7'])
+    410
+    """
+    _, _, cost_a, cost_b = vector_wire_crossings(Wire.from_moves(seq_a), Wire.from_moves(seq_b),
+                                                 memory_budget)
+    return int((cost_a + cost_b).min())
+
+#------------------------------------------------------------------------------#
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+def boxes_overlap(box_a, box_b):
+    """
+    True if two wire boxes share area. Every wire box holds the origin, and
+    crossings lie strictly inside a segment, so boxes that only meet along
+    an edge through the origin (or at the origin itself) cannot cross.
+
+    >>> up_right = Wire.from_moves(['R8','U5']).bbox
+    >>> boxes_overlap(up_right, Wire.from_moves(['L3','D3']).bbox)
+    False
+    >>> boxes_overlap(up_right, Wire.from_moves(['U7','L3']).bbox)
+    False
+    >>> boxes_overlap(up_right, Wire.from_moves(['U7','R6','D4']).bbox)
+    True
+    """
+    return box_a[0] < box_b[2] and box_b[0] < box_a[2] \
+       and box_a[1] < box_b[3] and box_b[1] < box_a[3]
+
+board_wires = []
+
+def init_board_worker(wires):
+    board_wires[:] = wires
+
+def solve_wire_pair(pair):
+    """Nearest Manhattan distance and fewest combined steps for one pair."""
+    i, j = pair
+    return (i, j) + wire_pair_answers(board_wires[i], board_wires[j])
+
+def solve_wire_board(sequences, workers=None, chunksize=64):
+    """
+    Crosses every pair of K wires on a process pool. Pairs whose bounding
+    boxes do not overlap are skipped; each worker receives the wires once
+    through its initializer. Returns {(i, j): (distance, steps)} for the
+    pairs that cross.
+
+    >>> codes = read_codes('day_3_input.txt')
+    >>> solve_wire_board([codes[0], codes[1], ['L1', 'D1']], workers=2)
+    {(0, 1): (207, 21196)}
+    """
+    wires = [Wire.from_moves(sequence) for sequence in sequences]
+    pairs = [(i, j) for i, j in combinations(range(len(wires)), 2)
+             if boxes_overlap(wires[i].bbox, wires[j].bbox)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_board_worker,
+                             initargs=(wires,)) as executor:
+        results = executor.map(solve_wire_pair, pairs, chunksize=chunksize)
+        return {(i, j): (distance, steps) for i, j, distance, steps in results
+                if distance is not None}
+
+def solve_wire_board_file(filename, workers=None):
+    return solve_wire_board(read_codes(filename), workers)
+
+#------------------------------------------------------------------------------#
+from array import array
+
+HORIZONTAL, VERTICAL, POINT = 0, 1, 2
+
+class Wire:
+    """
+    Wire path in typed arrays: vertex coordinates, the orientation of each
+    segment, the step count at each vertex and the bounding box.
+
+    >>> wire = Wire.from_moves(['R8','U5','L5','D3'])
+    >>> len(wire), wire.node(2), wire.bbox
+    (4, (8, 5), (0, 0, 8, 5))
+    >>> wire.orientation.tolist(), wire.steps.tolist()
+    ([0, 1, 0, 1], [0, 8, 13, 18, 21])
+    >>> wire.steps_at(3, (3, 3))
+    20
+    >>> wire.pop_node()
+    (3, 2)
+    >>> len(wire), wire.bbox
+    (3, (0, 0, 8, 5))
+    """
+    __slots__ = ('xs', 'ys', 'orientation', 'steps', '_bbox')
+
+    def __init__(self, node_seq):
+        self.xs = array('q')
+        self.ys = array('q')
+        self.orientation = array('b')
+        self.steps = array('q')
+        self._bbox = None
+        for node in node_seq:
+            self.append_node(node)
+
+    def append_node(self, node):
+        x, y = node
+        if self.xs:
+            dx = x - self.xs[-1]
+            dy = y - self.ys[-1]
+            self.orientation.append(HORIZONTAL if dx else VERTICAL if dy else POINT)
+            self.steps.append(self.steps[-1] + abs(dx) + abs(dy))
+            if self._bbox is not None:
+                x_min, y_min, x_max, y_max = self._bbox
+                self._bbox = (min(x_min, x), min(y_min, y), max(x_max, x), max(y_max, y))
+        else:
+            self.steps.append(0)
+            self._bbox = (x, y, x, y)
+        self.xs.append(x)
+        self.ys.append(y)
+
+    def pop_node(self):
+        """Removes the last vertex; the box is recomputed lazily if it shrinks."""
+        x, y = self.xs.pop(), self.ys.pop()
+        self.steps.pop()
+        if self.orientation:
+            self.orientation.pop()
+        box = self._bbox
+        if box is not None and (x in (box[0], box[2]) or y in (box[1], box[3])):
+            self._bbox = None
+        return (x, y)
+
+    @property
+    def bbox(self):
+        if self._bbox is None and self.xs:
+            self._bbox = (min(self.xs), min(self.ys), max(self.xs), max(self.ys))
+        return self._bbox
+
+    @classmethod
+    def from_moves(cls, moves):
+        """
+        Builds a wire from move strings or (direction, distance) pairs,
+        consuming them lazily.
+
+        >>> Wire.from_moves([('R', 8), ('U', 5)]).nodes()
+        [(0, 0), (8, 0), (8, 5)]
+        """
+        wire = cls([(0, 0)])
+        for move in moves:
+            if isinstance(move, str):
+                move = (move[0], int(move[1:]))
+            direction = direction_map[move[0]]
+            wire.append_node((wire.xs[-1] + direction[0] * move[1],
+                              wire.ys[-1] + direction[1] * move[1]))
+        return wire
+
+    def __len__(self):
+        return len(self.orientation)
+
+    def node(self, i):
+        return (self.xs[i], self.ys[i])
+
+    def nodes(self):
+        return list(zip(self.xs, self.ys))
+
+    def steps_at(self, i, point):
+        """Steps to reach `point` on segment `i`."""
+        return self.steps[i] + abs(point[0] - self.xs[i]) + abs(point[1] - self.ys[i])
+
+    def split_segments(self):
+        """
+        Horizontal (y, x_lo, x_hi, index) and vertical (x, y_lo, y_hi, index)
+        segments; zero-length moves are dropped.
+
+        >>> Wire([(0,0),(8,0),(8,5),(8,5),(3,5)]).split_segments()
+        ([(0, 0, 8, 0), (5, 3, 8, 3)], [(8, 0, 5, 1)])
+        """
+        xs, ys = self.xs, self.ys
+        horizontal = []
+        vertical = []
+        for i, orientation in enumerate(self.orientation):
+            if orientation == HORIZONTAL:
+                horizontal.append((ys[i], min(xs[i], xs[i + 1]), max(xs[i], xs[i + 1]), i))
+            elif orientation == VERTICAL:
+                vertical.append((xs[i], min(ys[i], ys[i + 1]), max(ys[i], ys[i + 1]), i))
+        return horizontal, vertical
+
+#------------------------------------------------------------------------------#
+import re
+import time
+from itertools import groupby
+
+class WireTokenizer:
+    """
+    Streams moves out of a wire file in fixed-size byte chunks and yields
+    (line, direction, distance) without holding a whole line in memory.
+    Malformed moves raise ValueError with their line and column.
+
+    >>> tokenizer = WireTokenizer('day_3_input.txt', chunk_size=16)
+    >>> moves = list(tokenizer)
+    >>> moves[:2], len(moves)
+    ([(1, 'R', 1004), (1, 'U', 520)], 602)
+    >>> tokenizer.bytes_read, tokenizer.moves
+    (2945, 602)
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'wires.txt')
+    >>> with open(path, 'w') as f:
+    ...     _ = f.write('R8,U5\\nU7,X6,D4\\n')
+    >>> list(WireTokenizer(path))
+    Traceback (most recent call last):
+    ...
+    ValueError: line 2 column 4: malformed move 'X6'
+    >>> with open(path, 'w') as f:
+    ...     _ = f.write('R8,U5,,L5\\n')
+    >>> list(WireTokenizer(path))
+    Traceback (most recent call last):
+    ...
+    ValueError: line 1 column 7: empty move
+    """
+    token_pattern = re.compile(rb'([^,\n]*)([,\n]?)')
+
+    def __init__(self, filename, chunk_size=1 << 20):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.moves = 0
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        self.bytes_read = 0
+        self.moves = 0
+        self.elapsed = 0.0
+        line, column = 1, 1
+        after_comma = False
+        carry = b''
+        with open(self.filename, 'rb') as f:
+            while True:
+                start = time.perf_counter()
+                chunk = f.read(self.chunk_size)
+                self.bytes_read += len(chunk)
+                data = carry + chunk
+                # Only split up to the last separator unless at end of file
+                cut = max(data.rfind(b','), data.rfind(b'\n')) + 1 if chunk else len(data)
+                carry = data[cut:]
+                parsed = []
+                for match in self.token_pattern.finditer(data, 0, cut):
+                    token, separator = match.groups()
+                    if not token and not separator:
+                        if after_comma and not chunk:
+                            raise self.empty_move(line, column)
+                        continue
+                    move = token.strip()
+                    if move:
+                        parsed.append((line, self.parse_move(move, line, column)))
+                    elif after_comma or separator == b',':
+                        raise self.empty_move(line, column)
+                    after_comma = separator == b','
+                    column += len(token) + 1
+                    if separator == b'\n':
+                        line, column = line + 1, 1
+                self.moves += len(parsed)
+                self.elapsed += time.perf_counter() - start
+                for line_nr, (direction, distance) in parsed:
+                    yield (line_nr, direction, distance)
+                if not chunk:
+                    break
+
+    @staticmethod
+    def parse_move(move, line, column):
+        direction = move[:1].decode('ascii', 'replace')
+        distance = move[1:]
+        if direction not in direction_map or not distance.isdigit():
+            raise ValueError('line {} column {}: malformed move {!r}'.format(
+                line, column, move.decode('ascii', 'replace')))
+        return (direction, int(distance))
+
+    @staticmethod
+    def empty_move(line, column):
+        return ValueError('line {} column {}: empty move'.format(line, column))
+
+    def throughput(self):
+        """(MB/s, moves/s) of the last pass."""
+        if self.elapsed == 0:
+            return (0.0, 0.0)
+        return (self.bytes_read / self.elapsed / 1e6, self.moves / self.elapsed)
+
+    def wires(self):
+        """Yields one Wire per line, fed straight from the token stream."""
+        for _, moves in groupby(self, key=lambda move: move[0]):
+            yield Wire.from_moves(move[1:] for move in moves)
+
+def wire_pair_answers(wire_a, wire_b):
+    """
+    Nearest Manhattan distance and fewest combined steps of two Wires, or
+    (None, None) if they do not cross.
+
+    >>> wire_pair_answers(Wire.from_moves(['R8','U5','L5','D3']), Wire.from_moves(['U7','R6','D4','L4']))
+    (6, 30)
+    >>> wire_pair_answers(Wire.from_moves(['R8','U5']), Wire.from_moves(['L1','D1']))
+    (None, None)
+    """
+    crossings = sweep_wire_crossings(wire_a, wire_b)
+    if not crossings:
+        return (None, None)
+    distance = min(abs(x) + abs(y) for _, _, (x, y) in crossings)
+    steps = min(wire_a.steps_at(a, point) + wire_b.steps_at(b, point)
+                for a, b, point in crossings)
+    return (distance, steps)
+
+def stream_solve_fuel_wirring(filename='day_3_input.txt', chunk_size=1 << 20):
+    """
+    >>> stream_solve_fuel_wirring(chunk_size=100)
+    (207, 21196)
+    """
+    wires = WireTokenizer(filename, chunk_size).wires()
+    return wire_pair_answers(next(wires), next(wires))
+
+#------------------------------------------------------------------------------#
+import heapq
+
+def wire_blocks(wire, block_size):
+    """
+    Splits a Wire into runs of `block_size` segments and returns
+    (first_segment, end_segment, bbox, min_steps) for each run.
+
+    >>> wire_blocks(Wire.from_moves(['R8','U5','L5','D3']), 3)
+    [(0, 3, (0, 0, 8, 5), 0), (3, 4, (3, 2, 3, 5), 18)]
+    """
+    blocks = []
+    for first in range(0, len(wire), block_size):
+        end = min(first + block_size, len(wire))
+        xs = wire.xs[first:end + 1]
+        ys = wire.ys[first:end + 1]
+        blocks.append((first, end, (min(xs), min(ys), max(xs), max(ys)), wire.steps[first]))
+    return blocks
+
+def box_distance(box):
+    """Smallest |x| + |y| over a box."""
+    dx = 0 if box[0] <= 0 <= box[2] else min(abs(box[0]), abs(box[2]))
+    dy = 0 if box[1] <= 0 <= box[3] else min(abs(box[1]), abs(box[3]))
+    return dx + dy
+
+def block_crossings(wire_a, block_a, wire_b, block_b):
+    """Yields (a, b, point) for the crossings between two blocks."""
+    for a in range(block_a[0], block_a[1]):
+        seg_a = [wire_a.node(a), wire_a.node(a + 1)]
+        for b in range(block_b[0], block_b[1]):
+            seg_b = [wire_b.node(b), wire_b.node(b + 1)]
+            point = linear_interp_intersect(seg_a, seg_b) or linear_interp_intersect(seg_b, seg_a)
+            if point:
+                yield (a, b, point)
+
+def union_box(box_a, box_b):
+    return (min(box_a[0], box_b[0]), min(box_a[1], box_b[1]),
+            max(box_a[2], box_b[2]), max(box_a[3], box_b[3]))
+
+def block_tree(blocks):
+    """
+    Bounding boxes over runs of 1, 2, 4, ... consecutive blocks. A wire
+    rarely jumps, so neighbouring blocks make tight boxes.
+
+    >>> [len(level) for level in block_tree(wire_blocks(Wire.from_moves(['R1'] * 5), 1))]
+    [5, 3, 2, 1]
+    """
+    levels = [[block[2] for block in blocks]]
+    while len(levels[-1]) > 1:
+        boxes = levels[-1]
+        levels.append([union_box(*boxes[i:i + 2]) if i + 1 < len(boxes) else boxes[i]
+                       for i in range(0, len(boxes), 2)])
+    return levels
+
+def overlapping_blocks(levels, box):
+    """Indices of the level-0 boxes that overlap `box`, descending from the top."""
+    if not levels[0]:
+        return
+    stack = [(len(levels) - 1, 0)]
+    while stack:
+        level, i = stack.pop()
+        node = levels[level][i]
+        if node[0] > box[2] or box[0] > node[2] or node[1] > box[3] or box[1] > node[3]:
+            continue
+        if level == 0:
+            yield i
+        else:
+            stack.extend((level - 1, child) for child in (2 * i, 2 * i + 1)
+                         if child < len(levels[level - 1]))
+
+def nearest_crossings(wire_a, wire_b, k=1, by='distance', block_size=8):
+    """
+    Best-first search for the k crossings with the smallest Manhattan
+    distance (by='distance') or combined steps (by='steps'). Blocks of A
+    start in the queue under their own lower bound; a popped A block is
+    paired with the overlapping blocks of B, found through a box hierarchy,
+    and the pairs go back in the queue under their tighter bound. The
+    search stops once nothing left in the queue can beat the k-th best
+    value found so far. Returns [(value, point)] in ascending order.
+
+    >>> a = Wire.from_moves(['R8','U5','L5','D3'])
+    >>> b = Wire.from_moves(['U7','R6','D4','L4'])
+    >>> nearest_crossings(a, b, k=2, block_size=1)
+    [(6, (3, 3)), (11, (6, 5))]
+    >>> nearest_crossings(a, b, by='steps', block_size=2)
+    [(30, (6, 5))]
+    """
+    blocks_b = wire_blocks(wire_b, block_size)
+    tree_b = block_tree(blocks_b)
+    # (bound, A block start, B block start or -1 for an unpaired A block, block_a)
+    queue = [(box_distance(block_a[2]) if by == 'distance' else block_a[3], block_a[0], -1, block_a)
+             for block_a in wire_blocks(wire_a, block_size)]
+    heapq.heapify(queue)
+
+    best = []  # max-heap of the k best (negated value, point)
+    while queue:
+        bound, _, b_start, block_a = heapq.heappop(queue)
+        if len(best) == k and bound >= -best[0][0]:
+            break
+        if b_start < 0:
+            box_a = block_a[2]
+            for j in overlapping_blocks(tree_b, box_a):
+                block_b = blocks_b[j]
+                box_b = block_b[2]
+                box = (max(box_a[0], box_b[0]), max(box_a[1], box_b[1]),
+                       min(box_a[2], box_b[2]), min(box_a[3], box_b[3]))
+                pair_bound = box_distance(box) if by == 'distance' else block_a[3] + block_b[3]
+                heapq.heappush(queue, (pair_bound, block_a[0], block_b[0], block_a))
+            continue
+        block_b = blocks_b[b_start // block_size]
+        for a, b, point in block_crossings(wire_a, block_a, wire_b, block_b):
+            if by == 'distance':
+                value = abs(point[0]) + abs(point[1])
+            else:
+                value = wire_a.steps_at(a, point) + wire_b.steps_at(b, point)
+            if len(best) < k:
+                heapq.heappush(best, (-value, point))
+            elif value < -best[0][0]:
+                heapq.heapreplace(best, (-value, point))
+    return sorted((-value, point) for value, point in best)
+
+def best_first_manhattan_distance(seq_a, seq_b):
+    """
+    >>> best_first_manhattan_distance( \
+        ['R75','D30','R83','U83','L12','D49','R71','U7','L72'], \
+        ['U62','R66','U55','R34','D71','R55','D58','R83'])
+    159
+    >>> codes = read_codes('day_3_input.txt')
+    >>> best_first_manhattan_distance(codes[0], codes[1])
+    207
+    """
+    return nearest_crossings(Wire.from_moves(seq_a), Wire.from_moves(seq_b))[0][0]
+
+def best_first_closest_by_wire(seq_a, seq_b):
+    """
+    >>> best_first_closest_by_wire( \
+        ['R98','U47','R26','D63','R33','U87','L62','D20','R33','U53','R51'], \
+        ['U98','R91','D20','R16','D67','R40','U7','R15','U6','R7'])
+    410
+    >>> codes = read_codes('day_3_input.txt')
+    >>> best_first_closest_by_wire(codes[0], codes[1])
+    21196
+    """
+    return nearest_crossings(Wire.from_moves(seq_a), Wire.from_moves(seq_b), by='steps')[0][0]
+
+#------------------------------------------------------------------------------#
+class WirePair:
+    """
+    Two editable wires with a live set of crossings. Each wire keeps a
+    uniform grid hash of its segments, so a new segment is only tested
+    against segments of the other wire in the grid cells it passes through.
+    Crossing distances and step totals go into lazy-deletion heaps; entries
+    of removed crossings are dropped when they reach the top.
+
+    >>> pair = WirePair(['R8','U5','L5'], ['U7','R6','D4','L4'], cell_size=4)
+    >>> pair.intersections()
+    [(6, 5)]
+    >>> pair.append_move(0, 'D3')
+    >>> pair.intersections(), pair.nearest_distance(), pair.min_steps()
+    ([(6, 5), (3, 3)], 6, 30)
+    >>> pair.pop_move(1)
+    'L4'
+    >>> pair.intersections()
+    [(6, 5)]
+    >>> pair.set_move(0, 0, 'R4')
+    >>> pair.moves[0], pair.intersections()
+    (['R4', 'U5', 'L5', 'D3'], [(0, 5)])
+    >>> pair.nearest_distance(), pair.min_steps()
+    (5, 18)
+    """
+    def __init__(self, seq_a=(), seq_b=(), cell_size=256):
+        self.cell_size = cell_size
+        self.moves = ([], [])
+        self.wires = (Wire([(0, 0)]), Wire([(0, 0)]))
+        self.grids = ({}, {})
+        self.crossings = {}
+        self.crossings_by_segment = ({}, {})
+        self.distance_heap = []
+        self.steps_heap = []
+        for move in seq_a:
+            self.append_move(0, move)
+        for move in seq_b:
+            self.append_move(1, move)
+
+    def segment_cells(self, p, q):
+        size = self.cell_size
+        for cx in range(min(p[0], q[0]) // size, max(p[0], q[0]) // size + 1):
+            for cy in range(min(p[1], q[1]) // size, max(p[1], q[1]) // size + 1):
+                yield (cx, cy)
+
+    def append_move(self, wire, move):
+        path = self.wires[wire]
+        p = path.node(-1)
+        q = parse_input_node(p, move)
+        index = len(path)
+        path.append_node(q)
+        self.moves[wire].append(move)
+
+        other = 1 - wire
+        other_path = self.wires[other]
+        candidates = set()
+        for cell in self.segment_cells(p, q):
+            self.grids[wire].setdefault(cell, set()).add(index)
+            candidates.update(self.grids[other].get(cell, ()))
+
+        seg = [p, q]
+        for j in candidates:
+            seg_other = [other_path.node(j), other_path.node(j + 1)]
+            point = linear_interp_intersect(seg, seg_other) or linear_interp_intersect(seg_other, seg)
+            if point:
+                key = (index, j) if wire == 0 else (j, index)
+                self.crossings[key] = point
+                self.crossings_by_segment[wire].setdefault(index, set()).add(key)
+                self.crossings_by_segment[other].setdefault(j, set()).add(key)
+                heapq.heappush(self.distance_heap, (abs(point[0]) + abs(point[1]), key, point))
+                heapq.heappush(self.steps_heap, (self.crossing_steps(key, point), key, point))
+
+    def pop_move(self, wire):
+        path = self.wires[wire]
+        index = len(path) - 1
+        for cell in self.segment_cells(path.node(-2), path.node(-1)):
+            cell_segments = self.grids[wire][cell]
+            cell_segments.discard(index)
+            if not cell_segments:
+                del self.grids[wire][cell]
+        other = 1 - wire
+        for key in self.crossings_by_segment[wire].pop(index, ()):
+            del self.crossings[key]
+            j = key[other]
+            self.crossings_by_segment[other][j].discard(key)
+        path.pop_node()
+        if len(self.distance_heap) > 2 * len(self.crossings) + 64:
+            self.rebuild_heaps()
+        return self.moves[wire].pop()
+
+    def set_move(self, wire, index, move):
+        """Replaces one move; every later segment shifts, so they are re-added."""
+        tail = [self.pop_move(wire) for _ in range(len(self.moves[wire]) - index)][::-1]
+        for new_move in [move] + tail[1:]:
+            self.append_move(wire, new_move)
+
+    def intersections(self):
+        return [self.crossings[key] for key in sorted(self.crossings)]
+
+    def crossing_steps(self, key, point):
+        a, b = key
+        return self.wires[0].steps_at(a, point) + self.wires[1].steps_at(b, point)
+
+    def rebuild_heaps(self):
+        self.distance_heap = [(abs(point[0]) + abs(point[1]), key, point)
+                              for key, point in self.crossings.items()]
+        self.steps_heap = [(self.crossing_steps(key, point), key, point)
+                           for key, point in self.crossings.items()]
+        heapq.heapify(self.distance_heap)
+        heapq.heapify(self.steps_heap)
+
+    def heap_min(self, heap, value):
+        # A crossing removed and re-added under the same key may have moved
+        while heap:
+            best, key, point = heap[0]
+            if self.crossings.get(key) == point and value(key, point) == best:
+                return best
+            heapq.heappop(heap)
+        raise ValueError('wires do not cross')
+
+    def nearest_distance(self):
+        return self.heap_min(self.distance_heap, lambda key, point: abs(point[0]) + abs(point[1]))
+
+    def min_steps(self):
+        return self.heap_min(self.steps_heap, self.crossing_steps)
+
 #------------------------------------------------------------------------------#
 if __name__ == "__main__":
     import doctest
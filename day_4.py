@@ -80,6 +80,8 @@ def find_valid_passcodes_in_range(start, end, pass_check=check_passcode_validity
     >>> find_valid_passcodes_in_range(12, 19)
     []
     """
+    if pass_check in candidate_pair_checks and start >= 0:
+        return list(iter_valid_passcodes(start, end, candidate_pair_checks[pass_check]))
     return [p for p in range(start, end+1) if pass_check(p)]
 
 def split_range_input(range_input):
@@ -166,6 +168,142 @@ def recount_number_of_valid_passcodes(range_input):
                                                     recheck_passcode_validity)
     return len(valid_passcodes)
 
+#------------------------------------------------------------------------------#
+from functools import lru_cache
+
+def count_non_decreasing_up_to(limit, exact_pairs=False):
+    """
+    Counts the valid passcodes in [0, limit] with a digit DP over
+    non-decreasing digit sequences. With `exact_pairs` a qualifying run of
+    equal digits must be exactly two long (the part two rule).
+
+    >>> count_non_decreasing_up_to(113)
+    12
+    """
+    if limit < 0:
+        return 0
+    digits = [int(d) for d in str(limit)]
+
+    def qualifies(run):
+        return run == 2 if exact_pairs else run >= 2
+
+    @lru_cache(maxsize=None)
+    def count(pos, last, run, ok, tight, started):
+        if pos == len(digits):
+            return int(started and (ok or qualifies(run)))
+        total = 0
+        top = digits[pos] if tight else 9
+        if not started:
+            # Keep skipping leading zeros (a shorter number)
+            total += count(pos + 1, 0, 0, False, tight and top == 0, False)
+        for d in range(max(last, 1) if not started else last, top + 1):
+            if started and d == last:
+                next_run, next_ok = min(run + 1, 3), ok
+            else:
+                next_run, next_ok = 1, ok or (started and qualifies(run))
+            total += count(pos + 1, d, next_run, next_ok, tight and d == top, True)
+        return total
+
+    return count(0, 0, 0, False, True, False)
+
+def count_valid_passcodes(start, end, exact_pairs=False):
+    """
+    Number of valid passcodes in [start, end], in time that depends on the
+    number of digits rather than the size of the range.
+
+    >>> count_valid_passcodes(256310, 732736)
+    979
+    >>> count_valid_passcodes(256310, 732736, exact_pairs=True)
+    635
+    >>> count_valid_passcodes(100, 113) == len(find_valid_passcodes_in_range(100, 113))
+    True
+    >>> count_valid_passcodes(0, 5000, exact_pairs=True) == \
+        len(find_valid_passcodes_in_range(0, 5000, recheck_passcode_validity))
+    True
+    >>> count_valid_passcodes(10**19, 10**20 - 1)
+    3108105
+    """
+    if end < start:
+        return 0
+    return count_non_decreasing_up_to(end, exact_pairs) \
+         - count_non_decreasing_up_to(start - 1, exact_pairs)
+
+def dp_count_number_of_valid_passcodes(range_input):
+    """
+    >>> dp_count_number_of_valid_passcodes("256310-732736")
+    979
+    """
+    start, end = split_range_input(range_input)
+    return count_valid_passcodes(start, end)
+
+def dp_recount_number_of_valid_passcodes(range_input):
+    """
+    >>> dp_recount_number_of_valid_passcodes("256310-732736")
+    635
+    """
+    start, end = split_range_input(range_input)
+    return count_valid_passcodes(start, end, exact_pairs=True)
+
+#------------------------------------------------------------------------------#
+def next_non_decreasing(value):
+    """
+    Smallest number >= value whose digits never decrease.
+
+    >>> next_non_decreasing(256310), next_non_decreasing(10), next_non_decreasing(0)
+    (256666, 11, 0)
+    """
+    digits = int_to_char_list(max(value, 0))
+    for i in range(1, len(digits)):
+        if digits[i] < digits[i - 1]:
+            digits[i:] = digits[i - 1] * (len(digits) - i)
+            break
+    return int(''.join(digits))
+
+def iter_non_decreasing(start, end):
+    """
+    Lazily yields every number in [start, end] with non-decreasing digits,
+    in ascending order.
+
+    >>> list(iter_non_decreasing(7, 24))
+    [7, 8, 9, 11, 12, 13, 14, 15, 16, 17, 18, 19, 22, 23, 24]
+    """
+    value = next_non_decreasing(start)
+    while value <= end:
+        yield value
+        digits = int_to_char_list(value)
+        # Bump the rightmost digit below 9 and repeat it to the end
+        i = len(digits) - 1
+        while i >= 0 and digits[i] == '9':
+            i -= 1
+        if i < 0:
+            value = int('1' * (len(digits) + 1))
+        else:
+            bumped = str(int(digits[i]) + 1)
+            value = int(''.join(digits[:i]) + bumped * (len(digits) - i))
+
+def iter_valid_passcodes(start, end, pair_check=check_for_digit_pairs):
+    """
+    Streams the valid passcodes in [start, end], running `pair_check` only
+    on numbers whose digits never decrease.
+
+    >>> list(iter_valid_passcodes(100, 113))
+    [111, 112, 113]
+    >>> sum(1 for _ in iter_valid_passcodes(256310, 732736, check_for_even_digit_pairs))
+    635
+    >>> next(iter_valid_passcodes(10**17, 10**18))
+    111111111111111111
+    """
+    for value in iter_non_decreasing(start, end):
+        if pair_check(int_to_char_list(value)):
+            yield value
+
+# Full validity checks that can be answered by a non-decreasing candidate
+# stream plus their pair rule
+candidate_pair_checks = {
+    check_passcode_validity: check_for_digit_pairs,
+    recheck_passcode_validity: check_for_even_digit_pairs,
+}
+
 #------------------------------------------------------------------------------#
 if __name__ == "__main__":
     import doctest